@@ -2,248 +2,271 @@
 """Simplified monitor script for GitHub Actions - with login support."""
 
 import asyncio
+import json
 import os
+import re
 import sys
+import traceback
 from pathlib import Path
-from datetime import datetime, timezone, timedelta
-
-# Add src directory to path
-sys.path.insert(0, '/home/runner/work/chatbot-kb-monitor/chatbot_kb_monitor/src')
-
-async def main() -> int:
-    """Run monitoring with config from environment variables."""
-
-    # Get credentials from environment
-    username = os.environ.get("KB_USERNAME", "")
-    password = os.environ.get("KB_PASSWORD", "")
-    webhook_url = os.environ.get("LARK_WEBHOOK_URL", "")
-    app_id = os.environ.get("LARK_APP_ID", "")
-    app_secret = os.environ.get("LARK_APP_SECRET", "")
-    direct_kb_url = os.environ.get("DIRECT_KB_URL", "")
-    base_url = os.environ.get("BASE_URL", "https://admin.gbase.ai")
+from datetime import datetime, timezone
+
+from monitor_common import (
+    JAPAN_TZ,
+    SCREENSHOT_DIR,
+    Config,
+    error_payload,
+    get_lark_access_token_async,
+    launch_persistent_context,
+    login,
+    on_auth_page,
+    post_json,
+    preload_lark_sdk,
+    profile_has_state,
+    save_screenshot,
+    screenshot_table,
+    send_webhook,
+    upload_image_to_lark_sdk,
+)
+# src/ is on sys.path via monitor_common
+from automation.resources import BLOCKED_URL_RE, block_heavy_resources
+
+# Table row selectors, most specific first
+ROW_SELECTORS = [
+    ('.mantine-Table-tbody tr', 'Mantine Table body rows'),
+    ('[class*="mantine-Table-tbody"] tr', 'Mantine Table body (variant)'),
+    ('tbody tr', 'Standard table body rows'),
+    ('table tr', 'All table rows'),
+    ('[role="row"]', 'ARIA rows'),
+]
+
+# Status words that mark a row as failed, matched case-insensitively in one pass
+FAIL_RE = re.compile(r"失敗|エラー|error|failed|waiting", re.IGNORECASE)
+
+# Use the first selector that matches any rows and apply FAIL_RE inside the
+# page, so only the failed rows (index + first cell, which holds the file
+# name) and the total row count cross the CDP boundary.
+FAILED_ROWS_JS = """([sels, pattern]) => {
+    const failRe = new RegExp(pattern, 'i');
+    for (const sel of sels) {
+        const rows = document.querySelectorAll(sel);
+        if (rows.length === 0) continue;
+        const failed = [];
+        rows.forEach((r, index) => {
+            if (!failRe.test(r.innerText)) return;
+            const td = r.querySelector('td');
+            failed.push({index, first: td ? td.innerText : null});
+        });
+        return {selector: sel, total: rows.length, failed};
+    }
+    return {selector: null, total: 0, failed: []};
+}"""
+
+# Text of the row at a given index (null once it is gone), in one round-trip
+ROW_TEXT_AT_JS = """([sel, index]) => {
+    const row = document.querySelectorAll(sel)[index];
+    return row ? row.innerText : null;
+}"""
+
+# Body-row selectors only: 'table tr' / role=row also match the header, which
+# renders before the data and would end the wait early. One union wait
+# replaces up to 30s per selector tried in turn.
+ROW_WAIT_SELECTOR = ", ".join(sel for sel, _ in ROW_SELECTORS[:3])
+PASSWORD_SELECTOR = 'input[type="password"]'
+
+# Card header colour, header emoji and summary status line per run outcome
+REPORT_STYLES = {
+    "ok": ("green", "✅", "✅ All OK"),
+    "recovered": ("turquoise", "🔄", "🔄 Partially Recovered"),
+    "failed": ("red", "⚠️", "⚠️ Has Failures"),
+}
+
+# Dropdown opened by a row's three-dot menu button
+MENU_DROPDOWN_SELECTOR = '[role="menu"], [class*="Menu-dropdown"]'
+
+# Three-dot menu button inside a KB row. The generic last-button match is only
+# tried when none of the specific ones is present.
+ROW_MENU_SELECTOR = (
+    '.mantine-ActionIcon-icon, [class*="ActionIcon"], '
+    'button[aria-label*="more" i], button:has-text("…")'
+)
+ROW_MENU_FALLBACK_SELECTOR = 'button:last-child'
+
+# "重新学习" (Retry learning) item in the opened row menu, any locale. The bare
+# text matches are scoped to the dropdown so page text elsewhere can't win.
+RETRY_ITEM_SELECTOR = (
+    '.mantine-Menu-itemLabel:has-text("重新学习"), .mantine-Menu-itemLabel:has-text("再学習"), '
+    '[class*="Menu-item"]:has-text("重新学习"), [class*="Menu-item"]:has-text("再学習"), '
+    ':is([role="menu"], [class*="Menu-dropdown"]) :text("重新学习"), '
+    ':is([role="menu"], [class*="Menu-dropdown"]) :text("再学習")'
+)
+
+# True once the row at `index` no longer shows a failure status (or is gone)
+ROW_RECOVERED_JS = """([sel, index, pattern]) => {
+    const row = document.querySelectorAll(sel)[index];
+    return !row || !new RegExp(pattern, 'i').test(row.innerText);
+}"""
+
+# RECORD_API=1 logs the XHR endpoints that back the KB file list, with the
+# shape of their JSON responses, as a first step towards reading the list
+# without rendering the page. The file goes to debug_output/, which the
+# workflow uploads as an artifact on record_api runs.
+API_URL_RE = re.compile(r"/api/.*(dataset|file)", re.IGNORECASE)
+API_RECORD_FILE = Path("debug_output") / "api_record.json"
+_SECRET_HEADERS = {"authorization", "cookie", "x-csrf-token"}
+
+
+def json_shape(value, depth: int = 3):
+    """Keys and value types of a JSON body, without the data itself."""
+    if isinstance(value, dict):
+        if depth <= 0:
+            return "dict"
+        return {k: json_shape(v, depth - 1) for k, v in value.items()}
+    if isinstance(value, list):
+        return [json_shape(value[0], depth)] if value else []
+    return type(value).__name__
+
+
+def save_recorded_api(recorded: dict) -> None:
+    """Write the recorded endpoints (credential headers are dropped when recording)."""
+    API_RECORD_FILE.parent.mkdir(parents=True, exist_ok=True)
+    API_RECORD_FILE.write_text(json.dumps(recorded, ensure_ascii=False, indent=2))
+    print(f"  Recorded {len(recorded)} API endpoint(s) to {API_RECORD_FILE}")
+
+
+async def main(cfg: Config) -> int:
+    """Run monitoring with the given config."""
 
     # Validate required environment variables
-    if not username or not password:
+    if not cfg.username or not cfg.password:
         print("ERROR: KB_USERNAME and KB_PASSWORD must be set")
         return 1
 
-    if not webhook_url:
+    if not cfg.webhook_url:
         print("ERROR: LARK_WEBHOOK_URL must be set")
         return 1
 
+    if not cfg.direct_url:
+        print("ERROR: DIRECT_KB_URL must be set")
+        return 1
+
     print("=" * 60)
     print("Starting KB Monitor (GitHub Actions Version)")
     print("=" * 60)
-    print(f"Username: {'***' + username[-4:]}")
-    print(f"Webhook configured: {'YES' if webhook_url else 'NO'}")
-    print(f"Lark App configured: {'YES' if app_id else 'NO'}")
-    print(f"Direct KB URL: {direct_kb_url[:50]}..." if direct_kb_url else "Direct KB URL: Not set")
+    print(f"Username: {cfg.masked_username}")
+    print(f"Webhook configured: {'YES' if cfg.webhook_url else 'NO'}")
+    print(f"Lark App configured: {'YES' if cfg.app_id else 'NO'}")
+    print(f"Direct KB URL: {cfg.direct_url[:50]}...")
 
     # Debug: Show runner's system time
-    import time as time_module
     runner_utc = datetime.now(timezone.utc)
-    runner_jp = runner_utc.astimezone(timezone(timedelta(hours=9)))
+    runner_jp = runner_utc.astimezone(JAPAN_TZ)
     print(f"Runner UTC time: {runner_utc.strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"Runner JP time:  {runner_jp.strftime('%Y-%m-%d %H:%M:%S')}")
+    # Card/message time and artifact file stamp, formatted once per run
+    now_str = runner_jp.strftime('%Y-%m-%d %H:%M')
+    file_ts = runner_jp.strftime("%Y%m%d_%H%M%S")
     print("=" * 60)
 
-    # Helper function to get Japan time
-    def get_japan_time() -> datetime:
-        """Get current time in Japan timezone (UTC+9)."""
-        japan_tz = timezone(timedelta(hours=9))
-        return datetime.now(japan_tz)
-
     # Import here (after path is set)
     try:
         from playwright.async_api import async_playwright
 
-        print("Launching browser...")
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-
-            # Step 1: Login
-            print(f"[Step 1] Logging in to {base_url}")
-            await page.goto(base_url, wait_until="load", timeout=60000)
-            await asyncio.sleep(2)
-
-            # Fill credentials (login page uses placeholder attrs, not name attrs)
-            print("  Filling credentials...")
-            username_selectors = [
-                'input[name="username"]',
-                'input[placeholder*="アカウント"]',
-                'input[type="text"]',
-            ]
-            filled = False
-            for sel in username_selectors:
-                try:
-                    if await page.locator(sel).count() > 0:
-                        await page.fill(sel, username)
-                        print(f"  ✓ Username filled using: {sel}")
-                        filled = True
-                        break
-                except:
-                    continue
-            if not filled:
-                print("  ERROR: Could not find username input")
-                return 1
+        # Warm the Lark SDK import and fetch the tenant token while the
+        # browser starts and the page is scanned
+        sdk_import = token_task = None
+        if cfg.app_id and cfg.app_secret:
+            sdk_import = preload_lark_sdk()
+            token_task = asyncio.create_task(get_lark_access_token_async(cfg.app_id, cfg.app_secret))
 
-            await page.fill('input[type="password"]', password)
+        # Checked before launch, which populates the profile directory
+        warm_profile = profile_has_state()
 
-            # Click login button (try multiple selectors)
-            print("  Clicking login button...")
-            login_clicked = False
-            for selector in ['button[type="submit"]', 'button:has-text("ログイン")', '.login-button']:
-                try:
-                    if await page.locator(selector).count() > 0:
-                        await page.locator(selector).first.click()
-                        login_clicked = True
-                        print(f"  ✓ Clicked login using: {selector}")
-                        break
-                except:
-                    continue
-
-            if not login_clicked:
-                print("  ERROR: Could not find login button")
-                return 1
-
-            # Wait for navigation after login - Auth0 redirect may take time
-            print("  Waiting for login to complete (checking for redirect)...")
-            max_wait_time = 30  # seconds
-            check_interval = 2
-            elapsed = 0
-            login_success = False
-
-            # Check for login completion by monitoring URL changes
-            initial_url = page.url
-            print(f"  Initial URL after clicking login: {page.url[:80]}")
-
-            while elapsed < max_wait_time:
-                await asyncio.sleep(check_interval)
-                elapsed += check_interval
-
-                current_url = page.url
-                print(f"  [{elapsed}s] Current URL: {current_url[:80]}")
-
-                # Check if we're no longer on login page
-                if "/login" not in current_url and "auth0.com" not in current_url:
-                    print(f"  ✓ Login completed! Redirected to: {current_url[:80]}")
-                    login_success = True
-                    break
-
-                # If URL changed from initial, we're making progress
-                if current_url != initial_url:
-                    print(f"  ... URL changed, redirect in progress ...")
-                    initial_url = current_url
-
-            # If still on login/Auth0 page, try navigating to base URL directly
-            if not login_success or "/login" in page.url or "auth0.com" in page.url:
-                print("  ⚠ Login redirect may not have completed, trying direct navigation...")
-                await page.goto(base_url, wait_until="load", timeout=60000)
-                await asyncio.sleep(5)
-                print(f"  After direct nav: {page.url[:80]}")
-
-            # Step 2: Navigate to KB page
-            print(f"\n[Step 2] Navigating to KB page...")
-            if not direct_kb_url:
-                print("  ERROR: DIRECT_KB_URL must be set")
-                return 1
-
-            await page.goto(direct_kb_url, wait_until="networkidle", timeout=60000)
-            print(f"  ✓ Current URL: {page.url[:80]}")
-
-            # Wait for table rows to actually render (SPA loads data asynchronously)
-            # Fall through after timeout — Step 3 will still scan and produce a precise diagnosis
-            print("  Waiting for table rows to render...")
-            row_wait_selectors = [
-                '.mantine-Table-tbody tr',
-                '[class*="mantine-Table-tbody"] tr',
-                'tbody tr',
-                'table tr',
-                '[role="row"]',
-            ]
-            row_appeared = False
-            for wait_sel in row_wait_selectors:
-                try:
-                    await page.wait_for_selector(wait_sel, timeout=30000, state="attached")
-                    print(f"  ✓ Rows rendered (matched: {wait_sel})")
-                    row_appeared = True
-                    break
-                except Exception:
-                    continue
-            if not row_appeared:
-                print("  ⚠ No table rows appeared within 30s — page may be empty or stuck loading")
+        print("Launching browser...")
+        # The context is closed on every exit path (closing twice is a no-op), so
+        # the profile is flushed to disk for the next local run
+        async with async_playwright() as p, await launch_persistent_context(p) as browser:
+            await browser.route(BLOCKED_URL_RE, block_heavy_resources)
+            page = browser.pages[0] if browser.pages else await browser.new_page()
+
+            record_mode = os.environ.get("RECORD_API") == "1"
+            recorded_api = {}
+            if record_mode:
+                async def record_request(request):
+                    if request.resource_type in ("xhr", "fetch") and API_URL_RE.search(request.url):
+                        entry = recorded_api[request.url] = {
+                            "method": request.method,
+                            "headers": {k: v for k, v in request.headers.items()
+                                        if k.lower() not in _SECRET_HEADERS},
+                        }
+                        response = await request.response()
+                        if response and "json" in response.headers.get("content-type", ""):
+                            entry["status"] = response.status
+                            try:
+                                entry["shape"] = json_shape(await response.json())
+                            except Exception:
+                                pass
+                page.on("requestfinished", record_request)
+
+            # Step 1-2: A profile left by an earlier local run may still hold a
+            # session, so open the KB page directly and log in only when bounced.
+            # A fresh profile (every CI run) is logged out: log in first, which
+            # saves the wasted KB page load.
+            if warm_profile:
+                print(f"\n[Step 2] Navigating to KB page...")
+                if not await open_kb_page(page, cfg.direct_url):
+                    print("  No valid session, logging in")
+                    if not await login(page, cfg):
+                        return 1
+                    await open_kb_page(page, cfg.direct_url)
+            else:
+                if not await login(page, cfg):
+                    return 1
+                print(f"\n[Step 2] Navigating to KB page...")
+                await open_kb_page(page, cfg.direct_url)
 
             # Step 3: Scan for KB files using multiple selectors
             print(f"\n[Step 3] Scanning for KB files...")
 
-            selectors_to_try = [
-                ('.mantine-Table-tbody tr', 'Mantine Table body rows'),
-                ('[class*="mantine-Table-tbody"] tr', 'Mantine Table body (variant)'),
-                ('tbody tr', 'Standard table body rows'),
-                ('table tr', 'All table rows'),
-                ('[role="row"]', 'ARIA rows'),
-            ]
-
             total_items = 0
             failed_rows = []  # Store failed rows with file names
             files_found = False
             used_selector = None
 
-            for selector, description in selectors_to_try:
-                try:
-                    print(f"  Trying: {description} ({selector})")
-                    rows = await page.locator(selector).all()
-
-                    if len(rows) > 0:
-                        print(f"  ✓ Found {len(rows)} items using '{selector}'")
-                        files_found = True
-                        total_items = len(rows)
-                        used_selector = selector
-
-                        # Scan for failures and store row elements
-                        failure_indicators = ["失敗", "エラー", "error", "failed", "waiting"]
+            try:
+                # Selectors are tried in priority order inside the page, so the
+                # whole fallback chain costs a single round-trip
+                scan = await page.evaluate(
+                    FAILED_ROWS_JS, [[sel for sel, _ in ROW_SELECTORS], FAIL_RE.pattern]
+                )
+
+                if scan["total"] > 0:
+                    used_selector = scan["selector"]
+                    description = dict(ROW_SELECTORS)[used_selector]
+                    print(f"  ✓ Found {scan['total']} items using {description} ('{used_selector}')")
+                    files_found = True
+                    total_items = scan["total"]
+
+                    # Store failed rows with their indices
+                    for row in scan["failed"]:
+                        i = row["index"]
+                        # Extract file name (first cell usually)
+                        if row["first"] is not None:
+                            file_name = row["first"].strip()
+                            failed_rows.append({
+                                'file_name': file_name,
+                                'index': i
+                            })
+                            print(f"    Failed: {file_name}")
+                        else:
+                            failed_rows.append({
+                                'file_name': f'File #{i}',
+                                'index': i
+                            })
+                            print(f"    Failed: (unable to get name)")
 
-                        for i, row in enumerate(rows):
-                            try:
-                                row_text = await row.inner_text()
-                                row_text_lower = row_text.lower()
-
-                                # Check for failure indicators (case-insensitive)
-                                is_failed = False
-                                for indicator in failure_indicators:
-                                    if indicator in row_text_lower:
-                                        is_failed = True
-                                        break
-
-                                if is_failed:
-                                    # Extract file name (first cell usually)
-                                    try:
-                                        first_cell = row.locator('td').first
-                                        if await first_cell.count() > 0:
-                                            file_name = await first_cell.inner_text()
-                                            file_name = file_name.strip()
-                                            failed_rows.append({
-                                                'row': row,
-                                                'file_name': file_name,
-                                                'index': i
-                                            })
-                                            print(f"    Failed: {file_name}")
-                                    except:
-                                        failed_rows.append({
-                                            'row': row,
-                                            'file_name': f'File #{i}',
-                                            'index': i
-                                        })
-                                        print(f"    Failed: (unable to get name)")
-                            except Exception as e:
-                                continue
-
-                        print(f"  Total: {total_items} items, {len(failed_rows)} failed")
-                        break  # Use first successful selector
-                except Exception as e:
-                    print(f"  Selector '{selector}' failed: {e}")
-                    continue
+                    print(f"  Total: {total_items} items, {len(failed_rows)} failed")
+            except Exception as e:
+                print(f"  Row scan failed: {e}")
 
             if not files_found or total_items == 0:
                 print("\nERROR: No KB files found on page!")
@@ -272,10 +295,8 @@ async def main() -> int:
                 print(f"  Diagnosis: {diagnosis}")
 
                 # Save screenshot + HTML for post-mortem diagnosis
-                os.makedirs("screenshots", exist_ok=True)
-                debug_ts = get_japan_time().strftime("%Y%m%d_%H%M%S")
-                fail_screenshot = f"screenshots/failure_{debug_ts}.png"
-                fail_html = f"screenshots/failure_{debug_ts}.html"
+                fail_screenshot = SCREENSHOT_DIR / f"failure_{file_ts}.png"
+                fail_html = SCREENSHOT_DIR / f"failure_{file_ts}.html"
                 try:
                     await page.screenshot(path=fail_screenshot, full_page=True)
                     print(f"  Failure screenshot saved: {fail_screenshot}")
@@ -283,35 +304,31 @@ async def main() -> int:
                     print(f"  Could not save screenshot: {e}")
                 try:
                     html_content = await page.content()
-                    Path(fail_html).write_text(html_content, encoding="utf-8")
+                    fail_html.write_text(html_content, encoding="utf-8")
                     print(f"  Failure HTML saved: {fail_html}")
                 except Exception as e:
                     print(f"  Could not save HTML: {e}")
 
                 # Send error notification (with diagnosis)
-                import requests
-
-                error_msg = f"""⚠️ KB Monitor Failed
-
-**Time**: {get_japan_time().strftime('%Y-%m-%d %H:%M')} (Asia/Tokyo)
-
-**Error**: No KB files found on page
-
-**Diagnosis**: {diagnosis}
-
-**URL**: {direct_kb_url[:80] if direct_kb_url else 'Not set'}...
-
-**Debug artifacts**: screenshot + HTML uploaded to GitHub Actions run
-
----
-*This is an automated message*"""
+                error_msg = error_payload("KB Monitor Failed", now_str, [
+                    ("Error", "No KB files found on page"),
+                    ("Diagnosis", diagnosis),
+                    ("URL", f"{cfg.direct_url[:80]}..."),
+                    ("Debug artifacts", "screenshot + HTML uploaded to GitHub Actions run"),
+                ])
 
-                response = requests.post(webhook_url, json={"msg_type": "text", "content": {"text": error_msg}}, timeout=10)
-                print(f"Error notification sent: {response.status_code}")
+                # Deliver the alert while Chromium shuts down
+                await asyncio.gather(
+                    send_webhook(cfg.webhook_url, error_msg, "Error notification"),
+                    browser.close(),
+                )
                 return 1
 
             print(f"\n[Step 4] SCAN COMPLETE: {total_items} total items, {len(failed_rows)} failed")
 
+            if record_mode:
+                save_recorded_api(recorded_api)
+
             # Step 4.5: Retry failed items (if any)
             retry_results = []
             if failed_rows:
@@ -323,40 +340,50 @@ async def main() -> int:
             print(f"\n[Step 5] Taking screenshot...")
             content_height = await page.evaluate("() => document.documentElement.scrollHeight")
             await page.set_viewport_size({"width": 1280, "height": max(content_height, 1080)})
-            await asyncio.sleep(1)
+            # Two animation frames: the resize has been laid out and painted
+            await page.evaluate(
+                "() => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)))"
+            )
 
-            timestamp = get_japan_time().strftime("%Y%m%d_%H%M%S")
-            screenshot_path = f"screenshots/status_{timestamp}.png"
-            os.makedirs("screenshots", exist_ok=True)
+            screenshot_path = SCREENSHOT_DIR / f"status_{file_ts}.jpg"
 
-            await page.screenshot(path=screenshot_path, full_page=True)
-            print(f"  Screenshot saved: {screenshot_path} (viewport height: {max(content_height, 1080)}px)")
+            shot = await screenshot_table(page)
 
             # Step 6: Upload screenshot to Lark (optional)
-            image_key = None
-            if app_id and app_secret:
+            async def upload_screenshot():
+                if not token_task:
+                    return None
+                tenant_token = None
                 try:
-                    image_key = await upload_image_to_lark_sdk(
-                        screenshot_path, app_id, app_secret
-                    )
+                    tenant_token = await token_task
+                except Exception as e:
+                    print(f"  ⚠ Token fetch failed (falling back to SDK auth): {e}")
+                if sdk_import:
+                    await sdk_import
+                try:
+                    return await upload_image_to_lark_sdk(shot, cfg.app_id, cfg.app_secret, tenant_token)
                 except Exception as e:
                     print(f"  ⚠ Image upload failed (continuing without image): {e}")
-                    image_key = None
+                    return None
 
-            # Step 7: Send notification
-            import requests
+            # The artifact copy is written while the upload is in flight
+            image_key, _ = await asyncio.gather(
+                upload_screenshot(),
+                save_screenshot(screenshot_path, shot),
+            )
 
+            # Step 7: Send notification
             # Calculate final status
             initial_failed = len(failed_rows)
             successful_retries = sum(1 for r in retry_results if r['success'])
             still_failed = initial_failed - successful_retries
 
-            color = "green" if still_failed == 0 else ("turquoise" if successful_retries > 0 else "red")
-            emoji = "✅" if still_failed == 0 else ("🔄" if successful_retries > 0 else "⚠️")
+            outcome = "ok" if still_failed == 0 else ("recovered" if successful_retries > 0 else "failed")
+            color, emoji, status_label = REPORT_STYLES[outcome]
 
             # Build notification content
             summary_lines = [
-                f"**Time**: {get_japan_time().strftime('%Y-%m-%d %H:%M')} (Asia/Tokyo)",
+                f"**Time**: {now_str} (Asia/Tokyo)",
                 "",
                 "**Summary**:",
                 f"• Total Items: {total_items}",
@@ -367,12 +394,12 @@ async def main() -> int:
                 summary_lines.extend([
                     f"• Successfully Retried: {successful_retries}",
                     f"• Still Failed: {still_failed}",
-                    f"• Status: {'✅ All OK' if still_failed == 0 else '🔄 Partially Recovered' if successful_retries > 0 else '⚠️ Has Failures'}",
+                    f"• Status: {status_label}",
                 ])
             else:
                 summary_lines.extend([
                     f"• Failed Items: {initial_failed}",
-                    f"• Status: {'✅ All OK' if initial_failed == 0 else '⚠️ Has Failures'}",
+                    f"• Status: {status_label}",
                 ])
 
             summary_lines.append(f"**Screenshot**: {'See below' if image_key else 'No screenshot available'}")
@@ -397,31 +424,29 @@ async def main() -> int:
             }
 
             # Add retry details if any retries were performed
+            # (only the first 10 items are formatted; the rest are just counted)
             if retry_results:
-                retry_details = []
-                for result in retry_results:
-                    status_icon = "✅" if result['success'] else "❌"
-                    retry_details.append(f"{status_icon} **{result['file_name']}**")
-                    if result['attempts'] > 0:
-                        retry_details.append(f"   Attempts: {result['attempts']}, Result: {result['final_status']}")
-
-                if retry_details:
-                    card["card"]["elements"].append({"tag": "hr"})
+                retry_details = "\n".join(
+                    f"{'✅' if r['success'] else '❌'} **{r['file_name']}**"
+                    + (f"\n   Attempts: {r['attempts']}, Result: {r['final_status']}" if r['attempts'] > 0 else "")
+                    for r in retry_results[:10]
+                )
+                card["card"]["elements"].append({"tag": "hr"})
+                card["card"]["elements"].append({
+                    "tag": "div",
+                    "text": {
+                        "tag": "lark_md",
+                        "content": "**Retry Details**:\n" + retry_details
+                    }
+                })
+                if len(retry_results) > 10:
                     card["card"]["elements"].append({
                         "tag": "div",
                         "text": {
                             "tag": "lark_md",
-                            "content": "**Retry Details**:\n" + "\n".join(retry_details[:10])
+                            "content": f"\n... and {len(retry_results) - 10} more"
                         }
                     })
-                    if len(retry_details) > 10:
-                        card["card"]["elements"].append({
-                            "tag": "div",
-                            "text": {
-                                "tag": "lark_md",
-                                "content": f"\n... and {len(retry_details) - 10} more"
-                            }
-                        })
 
             # Add image element if available
             if image_key:
@@ -431,10 +456,8 @@ async def main() -> int:
                     "alt": {"tag": "plain_text", "content": "KB Status Screenshot"}
                 })
 
-            response = requests.post(webhook_url, json=card, timeout=10)
-            print(f"Notification sent: {response.status_code}")
-
-            await browser.close()
+            # Deliver the report while Chromium shuts down
+            await asyncio.gather(send_webhook(cfg.webhook_url, card), browser.close())
 
             print("\n" + "=" * 60)
             print("MONITOR COMPLETED SUCCESSFULLY!")
@@ -442,22 +465,12 @@ async def main() -> int:
 
     except Exception as e:
         print(f"ERROR: {e}")
-        import traceback
         traceback.print_exc()
 
         # Send error notification
-        import requests
+        error_msg = error_payload("KB Monitor Error", now_str, [("Error", str(e))])
 
-        error_msg = f"""⚠️ KB Monitor Error
-
-**Time**: {get_japan_time().strftime('%Y-%m-%d %H:%M')} (Asia/Tokyo)
-
-**Error**: {str(e)}
-
----
-*This is an automated message*"""
-
-        response = requests.post(webhook_url, json={"msg_type": "text", "content": {"text": error_msg}}, timeout=10)
+        response = await post_json(cfg.webhook_url, error_msg)
         print(f"Error notification sent: {response.status_code}")
 
         return 1
@@ -465,69 +478,29 @@ async def main() -> int:
     return 0
 
 
-async def upload_image_to_lark_sdk(image_path: str, app_id: str, app_secret: str) -> str:
-    """Upload image to Lark using official SDK (same as local script)."""
-    # Use correct import path
-    from lark_oapi.api.im.v1.model.create_image_request import CreateImageRequest
-    from lark_oapi.api.im.v1.model.create_image_request_body import CreateImageRequestBody
-    import lark_oapi
-
-    # Read image
-    image_file = Path(image_path)
-    if not image_file.exists():
-        print(f"Image not found: {image_path}")
-        return None
+async def open_kb_page(page, url: str) -> bool:
+    """Navigate to the KB list and wait for its rows to render.
 
+    Returns False if the page ended up on the login form instead.
+    """
+    # The row wait below is the real readiness signal
+    await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+    print(f"  ✓ Current URL: {page.url[:80]}")
+
+    # Wait for table rows to actually render (SPA loads data asynchronously), or
+    # for the login form if the session has expired. Fall through after timeout —
+    # Step 3 will still scan and produce a precise diagnosis.
+    print("  Waiting for table rows to render...")
     try:
-        print(f"Uploading image using Lark SDK...")
-
-        # Create image upload request
-        request = (
-            CreateImageRequest.builder()
-            .request_body(
-                CreateImageRequestBody.builder()
-                .image_type("message")  # for use in message cards
-                .build()
-            )
-            .build()
-        )
-
-        # Open file and attach to request body
-        with open(image_file, 'rb') as f:
-            request.body.image = f
-
-            # Get client using app credentials
-            client = (
-                lark_oapi.Client.builder()
-                .app_id(app_id)
-                .app_secret(app_secret)
-                .build()
-            )
-
-            # Call the API
-            response = client.im.v1.image.create(request)
-
-        # Handle response
-        if response.code != 0:
-            print(f"Lark API error: code={response.code}, msg={response.msg}")
-            return None
+        await page.wait_for_selector(f"{ROW_WAIT_SELECTOR}, {PASSWORD_SELECTOR}", timeout=30000, state="attached")
+    except Exception:
+        print("  ⚠ No table rows appeared within 30s — page may be empty or stuck loading")
+        return not on_auth_page(page.url)
 
-        if not response.data or not hasattr(response.data, 'image_key'):
-            print("No image_key in response")
-            return None
-
-        image_key = response.data.image_key
-        print(f"✓ Image uploaded: {image_key}")
-        return image_key
-
-    except ImportError as e:
-        print(f"lark-oapi SDK import error: {e}")
-        return None
-    except Exception as e:
-        print(f"Upload error: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+    if on_auth_page(page.url) or await page.locator(PASSWORD_SELECTOR).count() > 0:
+        return False
+    print("  ✓ Rows rendered")
+    return True
 
 
 async def retry_failed_items(page, failed_rows: list, table_selector: str) -> list:
@@ -536,15 +509,18 @@ async def retry_failed_items(page, failed_rows: list, table_selector: str) -> li
 
     Args:
         page: Playwright page object
-        failed_rows: List of dicts with 'row', 'file_name', 'index'
+        failed_rows: List of dicts with 'file_name', 'index'
         table_selector: The selector that successfully found the table
 
     Returns:
         List of retry results with file_name, attempts, final_status
     """
     results = []
-    failure_indicators = ["失敗", "エラー", "error", "failed", "waiting"]
     MAX_RETRIES = 3
+    # Lazy locators: built once, resolved against the live DOM on each use
+    rows = page.locator(table_selector)
+    retry_item = page.locator(RETRY_ITEM_SELECTOR).first
+    menu_dropdown = page.locator(MENU_DROPDOWN_SELECTOR).first
 
     for item in failed_rows:
         file_name = item['file_name']
@@ -563,34 +539,21 @@ async def retry_failed_items(page, failed_rows: list, table_selector: str) -> li
             print(f"    Attempt {attempt}/{MAX_RETRIES}...", end=" ")
 
             try:
-                # Re-find the row (page may have changed)
-                rows = await page.locator(table_selector).all()
-                if row_index >= len(rows):
+                # Re-resolve the row (page may have changed)
+                current_row = rows.nth(row_index)
+                if await current_row.count() == 0:
                     print(f"SKIP (row no longer exists)")
                     result['final_status'] = 'row_disappeared'
                     break
 
-                current_row = rows[row_index]
-
                 # Click the three-dot menu (ActionIcon)
-                # Try multiple selectors for the menu button
                 menu_clicked = False
-                menu_selectors = [
-                    current_row.locator('.mantine-ActionIcon-icon'),
-                    current_row.locator('[class*="ActionIcon"]'),
-                    current_row.locator('button[aria-label*="more" i]'),
-                    current_row.locator('button:has-text("…")'),
-                    current_row.locator('button:last-child'),
-                ]
-
-                for menu_sel in menu_selectors:
+                for sel in (ROW_MENU_SELECTOR, ROW_MENU_FALLBACK_SELECTOR):
                     try:
-                        if await menu_sel.count() > 0:
-                            await menu_sel.first.click()
-                            menu_clicked = True
-                            await asyncio.sleep(1)  # Wait for menu to appear
-                            break
-                    except:
+                        await current_row.locator(sel).first.click(timeout=2000)
+                        menu_clicked = True
+                        break
+                    except Exception:
                         continue
 
                 if not menu_clicked:
@@ -598,46 +561,38 @@ async def retry_failed_items(page, failed_rows: list, table_selector: str) -> li
                     result['final_status'] = 'menu_not_found'
                     break
 
-                # Click "重新学习" (Retry learning) menu item
+                # Click "重新学习" (Retry learning) once the menu has rendered it
                 # The menu item label class: mantine-Menu-itemLabel
                 retry_clicked = False
-                retry_selectors = [
-                    page.locator('.mantine-Menu-itemLabel:has-text("重新学习")'),
-                    page.locator('.mantine-Menu-itemLabel:has-text("再学習")'),
-                    page.locator('[class*="Menu-item"]:has-text("重新学习")'),
-                    page.locator('[class*="Menu-item"]:has-text("再学習")'),
-                    page.get_by_text("重新学习"),
-                    page.get_by_text("再学習"),
-                ]
-
-                for retry_sel in retry_selectors:
-                    try:
-                        if await retry_sel.count() > 0:
-                            await retry_sel.first.click()
-                            retry_clicked = True
-                            await asyncio.sleep(3)  # Wait for processing
-                            break
-                    except:
-                        continue
+                try:
+                    await retry_item.click(timeout=3000)
+                    retry_clicked = True
+                except Exception:
+                    pass
 
                 if not retry_clicked:
                     print(f"FAIL (could not find retry option)")
                     # Click outside to close menu
                     await page.keyboard.press('Escape')
-                    await asyncio.sleep(0.5)
+                    try:
+                        await menu_dropdown.wait_for(state="hidden", timeout=1000)
+                    except Exception:
+                        pass
                     result['final_status'] = 'retry_option_not_found'
                     break
 
-                # Check if status changed
-                await asyncio.sleep(2)  # Extra wait for status update
-                rows_after = await page.locator(table_selector).all()
-                if row_index < len(rows_after):
-                    check_row = rows_after[row_index]
-                    row_text = await check_row.inner_text()
+                # Wait (up to the old fixed 5s) for the row to leave the failed state
+                try:
+                    await page.wait_for_function(
+                        ROW_RECOVERED_JS, arg=[table_selector, row_index, FAIL_RE.pattern], timeout=5000
+                    )
+                except Exception:
+                    pass
 
-                    # Check if still has failure indicators (case-insensitive)
-                    row_text_lower = row_text.lower()
-                    still_failed = any(indicator in row_text_lower for indicator in failure_indicators)
+                # Check if status changed
+                row_text = await page.evaluate(ROW_TEXT_AT_JS, [table_selector, row_index])
+                if row_text is not None:
+                    still_failed = FAIL_RE.search(row_text) is not None
 
                     if not still_failed:
                         print(f"SUCCESS! ✓")
@@ -668,25 +623,5 @@ async def retry_failed_items(page, failed_rows: list, table_selector: str) -> li
     return results
 
 
-async def get_lark_access_token_async(app_id: str, app_secret: str) -> str:
-    """Get Lark access token - async version."""
-    import requests
-
-    url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
-    payload = {
-        "app_id": app_id,
-        "app_secret": app_secret
-    }
-
-    response = requests.post(url, json=payload, timeout=10)
-    response.raise_for_status()
-    result = response.json()
-
-    if result.get("code") != 0:
-        return None
-
-    return result.get("tenant_access_token")
-
-
 if __name__ == "__main__":
-    sys.exit(asyncio.run(main()))
+    sys.exit(asyncio.run(main(Config.from_env("DIRECT_KB_URL"))))
@@ -14,11 +14,31 @@ Unlike the file-based monitor (monitor_actions.py), this one:
 """
 
 import asyncio
-import os
 import re
 import sys
-from pathlib import Path
-from datetime import datetime, timezone, timedelta
+import traceback
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from monitor_common import (
+    JAPAN_TZ,
+    LOGIN_BUTTON_SELECTOR,
+    SCREENSHOT_DIR,
+    Config,
+    error_payload,
+    get_lark_access_token_async,
+    launch_persistent_context,
+    on_auth_page,
+    post_json,
+    preload_lark_sdk,
+    save_screenshot,
+    screenshot_table,
+    send_webhook,
+    settle,
+    upload_image_to_lark_sdk,
+)
+# src/ is on sys.path via monitor_common
+from automation.resources import BLOCKED_URL_RE, block_heavy_resources
 
 
 # Canonical status labels and their per-locale aliases. The admin UI renders
@@ -35,6 +55,26 @@ STATUS_ALIASES = {
 # "Completed" status cell, per locale.
 COMPLETED_ALIASES = ["completed", "完了", "已完成", "完成"]
 
+# One "<alias>: N" pattern per label, covering all of its aliases
+STATUS_COUNT_RES = {
+    label: re.compile(rf"(?:{'|'.join(map(re.escape, aliases))})\s*[：:]\s*(\d+)")
+    for label, aliases in STATUS_ALIASES.items()
+}
+COMPLETED_RE = re.compile("|".join(map(re.escape, COMPLETED_ALIASES)), re.IGNORECASE)
+
+
+# Using the first selector that yields any data rows, return the cell texts
+# of every row with at least `minCells` <td> cells, in a single round-trip.
+ROW_CELLS_JS = """([sels, minCells]) => {
+    for (const sel of sels) {
+        const rows = Array.from(document.querySelectorAll(sel))
+            .map(r => Array.from(r.querySelectorAll('td'), td => td.innerText))
+            .filter(cells => cells.length >= minCells);
+        if (rows.length) return {selector: sel, rows};
+    }
+    return {selector: null, rows: []};
+}"""
+
 
 def parse_status_counts(text: str) -> dict:
     """Extract {Learned: N, Learning: N, ...} from a Last Refresh cell text.
@@ -45,13 +85,8 @@ def parse_status_counts(text: str) -> dict:
     """
     counts = {}
     for label in STATUS_LABELS:
-        value = None
-        for alias in STATUS_ALIASES[label]:
-            m = re.search(rf"{re.escape(alias)}\s*[：:]\s*(\d+)", text)
-            if m:
-                value = int(m.group(1))
-                break
-        counts[label] = value
+        m = STATUS_COUNT_RES[label].search(text)
+        counts[label] = int(m.group(1)) if m else None
     return counts
 
 
@@ -62,8 +97,7 @@ def is_row_healthy(status_text: str, counts: dict) -> bool:
     Learned is allowed to be any value (including 0 — some sources may
     legitimately have no content, but we still surface them via the report).
     """
-    st = (status_text or "").lower()
-    if not any(alias in st for alias in COMPLETED_ALIASES):
+    if not COMPLETED_RE.search(status_text or ""):
         return False
     for label in ["Learning", "Waiting", "Failed", "Unavailable"]:
         v = counts.get(label)
@@ -75,62 +109,61 @@ def is_row_healthy(status_text: str, counts: dict) -> bool:
     return True
 
 
-async def main() -> int:
-    """Run web-connector monitoring with config from environment."""
-
-    username = os.environ.get("KB_USERNAME", "")
-    password = os.environ.get("KB_PASSWORD", "")
-    webhook_url = os.environ.get("LARK_WEBHOOK_URL", "")
-    app_id = os.environ.get("LARK_APP_ID", "")
-    app_secret = os.environ.get("LARK_APP_SECRET", "")
-    direct_url = os.environ.get("DIRECT_WEB_URL", "")
-    base_url = os.environ.get("BASE_URL", "https://admin.gbase.ai")
+async def main(cfg: Config) -> int:
+    """Run web-connector monitoring with the given config."""
 
-    if not username or not password:
+    if not cfg.username or not cfg.password:
         print("ERROR: KB_USERNAME and KB_PASSWORD must be set")
         return 1
-    if not webhook_url:
+    if not cfg.webhook_url:
         print("ERROR: LARK_WEBHOOK_URL must be set")
         return 1
-    if not direct_url:
+    if not cfg.direct_url:
         print("ERROR: DIRECT_WEB_URL must be set (web-connector page URL)")
         return 1
 
     print("=" * 60)
     print("Starting Website Connector Monitor")
     print("=" * 60)
-    print(f"Username: {'***' + username[-4:]}")
-    print(f"Webhook configured: {'YES' if webhook_url else 'NO'}")
-    print(f"Lark App configured: {'YES' if app_id else 'NO'}")
-    print(f"Direct URL: {direct_url[:80]}...")
+    print(f"Username: {cfg.masked_username}")
+    print(f"Webhook configured: {'YES' if cfg.webhook_url else 'NO'}")
+    print(f"Lark App configured: {'YES' if cfg.app_id else 'NO'}")
+    print(f"Direct URL: {cfg.direct_url[:80]}...")
 
     runner_utc = datetime.now(timezone.utc)
-    runner_jp = runner_utc.astimezone(timezone(timedelta(hours=9)))
+    runner_jp = runner_utc.astimezone(JAPAN_TZ)
     print(f"Runner UTC time: {runner_utc.strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"Runner JP time:  {runner_jp.strftime('%Y-%m-%d %H:%M:%S')}")
+    # Card/message time and artifact file stamp, formatted once per run
+    now_str = runner_jp.strftime('%Y-%m-%d %H:%M')
+    file_ts = runner_jp.strftime("%Y%m%d_%H%M%S")
     print("=" * 60)
 
-    def get_japan_time() -> datetime:
-        return datetime.now(timezone(timedelta(hours=9)))
-
     try:
         from playwright.async_api import async_playwright
-        import requests
+
+        # Warm the Lark SDK import and fetch the tenant token while the
+        # browser starts and the page is scanned
+        sdk_import = token_task = None
+        if cfg.app_id and cfg.app_secret:
+            sdk_import = preload_lark_sdk()
+            token_task = asyncio.create_task(get_lark_access_token_async(cfg.app_id, cfg.app_secret))
 
         print("Launching browser...")
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
+        # The context is closed on every exit path (closing twice is a no-op), so
+        # the profile is flushed to disk for the next local run
+        async with async_playwright() as p, await launch_persistent_context(p) as browser:
+            await browser.route(BLOCKED_URL_RE, block_heavy_resources)
+            page = browser.pages[0] if browser.pages else await browser.new_page()
 
             # Step 1: Login (same flow as monitor_actions.py)
-            print(f"[Step 1] Logging in to {base_url}")
-            await page.goto(base_url, wait_until="load", timeout=60000)
-            await asyncio.sleep(3)
+            print(f"[Step 1] Logging in to {cfg.base_url}")
+            await page.goto(cfg.base_url, wait_until="domcontentloaded", timeout=60000)
+            await settle(page)
 
             # Diagnostic: snapshot the login page before attempting fill
-            os.makedirs("screenshots", exist_ok=True)
             try:
-                pre_login_path = "screenshots/00_pre_login.png"
+                pre_login_path = SCREENSHOT_DIR / "00_pre_login.png"
                 await page.screenshot(path=pre_login_path, full_page=True)
                 print(f"  [diag] Login page URL: {page.url}")
                 print(f"  [diag] Login page title: {await page.title()}")
@@ -168,7 +201,7 @@ async def main() -> int:
                 for sel in username_selectors:
                     try:
                         await page.wait_for_selector(sel, timeout=8000, state="visible")
-                        await page.fill(sel, username)
+                        await page.fill(sel, cfg.username)
                         print(f"  ✓ Filled username using: {sel}")
                         username_filled = True
                         break
@@ -176,48 +209,56 @@ async def main() -> int:
                         print(f"  ✗ Selector '{sel}' didn't work: {str(e)[:80]}")
                         continue
                 if not username_filled:
-                    err_screenshot = "screenshots/01_no_username_field.png"
+                    err_screenshot = SCREENSHOT_DIR / "01_no_username_field.png"
                     await page.screenshot(path=err_screenshot, full_page=True)
                     raise RuntimeError(f"Could not find username input field. See {err_screenshot}")
 
                 for sel in ['input[type="password"]', 'input[name="password"]',
                             'input[autocomplete="current-password"]']:
                     try:
-                        await page.fill(sel, password)
+                        await page.fill(sel, cfg.password)
                         print(f"  ✓ Filled password using: {sel}")
                         break
                     except Exception:
                         continue
 
                 print("  Clicking login button...")
-                for selector in ['button[type="submit"]', 'button:has-text("ログイン")', '.login-button']:
-                    try:
-                        if await page.locator(selector).count() > 0:
-                            await page.locator(selector).first.click()
-                            print(f"  ✓ Clicked login using: {selector}")
-                            return True
-                    except Exception:
-                        continue
-                return False
+                try:
+                    await page.locator(f"{LOGIN_BUTTON_SELECTOR} >> visible=true").first.click(timeout=10000)
+                    print("  ✓ Clicked login")
+                    return True
+                except Exception:
+                    return False
 
             async def wait_for_login(max_wait_time: int = 45) -> bool:
-                """Poll until we leave the /login (and Auth0) pages."""
-                elapsed = 0
-                while elapsed < max_wait_time:
-                    await asyncio.sleep(2)
-                    elapsed += 2
-                    current_url = page.url
-                    if "/login" not in current_url and "auth0.com" not in current_url:
-                        print(f"  ✓ Login completed: {current_url[:80]}")
-                        return True
-                print(f"  ⚠ Still on login page after {max_wait_time}s: {page.url[:80]}")
-                return False
-
-            if not await fill_and_submit_login():
-                print("  ERROR: Could not find login button")
-                return 1
-            print("  Waiting for login to complete...")
-            await wait_for_login()
+                """Wait until we leave the /login (and Auth0) pages.
+
+                Resolves on the navigation that lands off the auth pages, not
+                on a poll tick.
+                """
+                try:
+                    await page.wait_for_url(
+                        lambda url: not on_auth_page(url), wait_until="commit", timeout=max_wait_time * 1000
+                    )
+                except Exception:
+                    print(f"  ⚠ Still on login page after {max_wait_time}s: {page.url[:80]}")
+                    return False
+                print(f"  ✓ Login completed: {page.url[:80]}")
+                return True
+
+            needs_login = (
+                on_auth_page(page.url)
+                or await page.locator('input[type="password"]').count() > 0
+            )
+            if not needs_login:
+                # A stale cookie is caught by the auth-bounce retry in Step 2
+                print(f"  ✓ Session restored from profile, skipping login: {page.url[:80]}")
+            else:
+                if not await fill_and_submit_login():
+                    print("  ERROR: Could not find login button")
+                    return 1
+                print("  Waiting for login to complete...")
+                await wait_for_login()
 
             # Step 2: Reach the web-connector page.
             #
@@ -231,8 +272,7 @@ async def main() -> int:
             # with auth, then client-side navigate (history.pushState + popstate)
             # to the deep route. Verified reliable in a real browser; the deep
             # hard-load was reproducibly empty.
-            from urllib.parse import urlparse
-            _pu = urlparse(direct_url)
+            _pu = urlparse(cfg.direct_url)
             spa_path = _pu.path or "/"
             if _pu.query:
                 spa_path += "?" + _pu.query
@@ -241,7 +281,10 @@ async def main() -> int:
 
             async def goto_web_connector() -> str:
                 print(f"\n[Step 2] Booting app on a shallow page, then client-side nav...")
-                await page.goto(f"{base_url}/bots", wait_until="load", timeout=60000)
+                # Keep the verified load + fixed 4s wait: a networkidle settle can
+                # return in a quiet gap before the Auth0 redirect or hydration,
+                # which would misread boot_url and push into a half-booted app
+                await page.goto(f"{cfg.base_url}/bots", wait_until="load", timeout=60000)
                 await asyncio.sleep(4)  # let the SPA boot + hydrate auth
                 boot_url = page.url
                 print(f"  ✓ Booted on: {boot_url[:80]}")
@@ -264,8 +307,8 @@ async def main() -> int:
             # authenticated. Retry the login once before giving up.
             if "/login" in current_url or "/auth" in current_url:
                 print("  ⚠ Bounced to auth page — session not authenticated. Retrying login once...")
-                await page.goto(base_url, wait_until="load", timeout=60000)
-                await asyncio.sleep(3)
+                await page.goto(cfg.base_url, wait_until="domcontentloaded", timeout=60000)
+                await settle(page)
                 if await fill_and_submit_login():
                     await wait_for_login()
                     current_url = await goto_web_connector()
@@ -274,20 +317,21 @@ async def main() -> int:
                 err = "Login failed — still redirected to the auth page"
                 print(f"\nERROR: {err}")
                 try:
-                    await page.screenshot(path="screenshots/02_login_failed.png", full_page=True)
+                    await page.screenshot(path=SCREENSHOT_DIR / "02_login_failed.png", full_page=True)
                 except Exception:
                     pass
-                error_msg = (
-                    f"⚠️ Website Monitor Failed\n\n"
-                    f"**Time**: {get_japan_time().strftime('%Y-%m-%d %H:%M')} (Asia/Tokyo)\n\n"
-                    f"**Error**: {err}\n\n"
-                    f"**URL**: {current_url[:80]}\n\n"
-                    f"**Please check**:\n"
-                    f"1. KB_USERNAME / KB_PASSWORD secrets\n"
-                    f"2. admin.gbase.ai login latency / availability\n\n"
-                    f"---\n*This is an automated message*"
+                error_msg = error_payload("Website Monitor Failed", now_str, [
+                    ("Error", err),
+                    ("URL", current_url[:80]),
+                    ("Please check", (
+                        "\n1. KB_USERNAME / KB_PASSWORD secrets\n"
+                        "2. admin.gbase.ai login latency / availability"
+                    )),
+                ])
+                await asyncio.gather(
+                    send_webhook(cfg.webhook_url, error_msg, "Error notification"),
+                    browser.close(),
                 )
-                requests.post(webhook_url, json={"msg_type": "text", "content": {"text": error_msg}}, timeout=10)
                 return 1
 
             # Step 3: Scan rows. The table is rendered client-side after an async
@@ -303,12 +347,14 @@ async def main() -> int:
                 ('tbody tr', 'Standard table body rows'),
             ]
             MIN_DATA_CELLS = 5  # a real source row has 7 cells; header has 0 td
+            row_selectors = [sel for sel, _ in selectors_to_try]
+            table_header = page.locator('table th')
 
             async def header_rendered() -> bool:
                 """True once the table header has painted (page loaded OK, even
                 if the data rows are still being fetched)."""
                 try:
-                    return (await page.locator('table th').count()) > 0
+                    return (await table_header.count()) > 0
                 except Exception:
                     return False
 
@@ -322,23 +368,18 @@ async def main() -> int:
                 """
                 waited = 0
                 while waited < poll_seconds:
-                    for selector, _desc in selectors_to_try:
-                        try:
-                            candidate = await page.locator(selector).all()
-                            if not candidate:
-                                continue
-                            # Keep only rows that actually carry data cells, so a
-                            # half-rendered header-only table doesn't win.
-                            data_rows = []
-                            for r in candidate:
-                                if await r.locator('td').count() >= MIN_DATA_CELLS:
-                                    data_rows.append(r)
-                            if data_rows:
-                                print(f"  ✓ Found {len(data_rows)} data rows using '{selector}' (after {waited}s)")
-                                return data_rows, selector
-                        except Exception as e:
-                            print(f"  Selector '{selector}' failed: {e}")
-                            continue
+                    try:
+                        # Keep only rows that actually carry data cells, so a
+                        # half-rendered header-only table doesn't win. Every
+                        # selector, the filter and the cell texts are handled
+                        # in one call.
+                        scan = await page.evaluate(ROW_CELLS_JS, [row_selectors, MIN_DATA_CELLS])
+                        if scan["rows"]:
+                            selector = scan["selector"]
+                            print(f"  ✓ Found {len(scan['rows'])} data rows using '{selector}' (after {waited}s)")
+                            return scan["rows"], selector
+                    except Exception as e:
+                        print(f"  Row scan failed: {e}")
                     await asyncio.sleep(3)
                     waited += 3
                 return [], None
@@ -362,7 +403,7 @@ async def main() -> int:
                     err = "Web-connector page did not render its table after ~150s"
                 print(f"\nERROR: {err}")
                 try:
-                    await page.screenshot(path="screenshots/03_no_rows.png", full_page=True)
+                    await page.screenshot(path=SCREENSHOT_DIR / "03_no_rows.png", full_page=True)
                 except Exception:
                     pass
                 checks = (
@@ -374,29 +415,28 @@ async def main() -> int:
                     "2. Login credentials\n"
                     "3. Page structure may have changed"
                 )
-                error_msg = (
-                    f"⚠️ Website Monitor Failed\n\n"
-                    f"**Time**: {get_japan_time().strftime('%Y-%m-%d %H:%M')} (Asia/Tokyo)\n\n"
-                    f"**Error**: {err}\n\n"
-                    f"**URL**: {page.url[:80]}\n\n"
-                    f"**Please check**:\n{checks}\n\n"
-                    f"---\n*This is an automated message*"
+                error_msg = error_payload("Website Monitor Failed", now_str, [
+                    ("Error", err),
+                    ("URL", page.url[:80]),
+                    ("Please check", f"\n{checks}"),
+                ])
+                await asyncio.gather(
+                    send_webhook(cfg.webhook_url, error_msg, "Error notification"),
+                    browser.close(),
                 )
-                requests.post(webhook_url, json={"msg_type": "text", "content": {"text": error_msg}}, timeout=10)
                 return 1
 
             # Parse each row
             row_results = []
-            for i, row in enumerate(rows):
+            for i, cells in enumerate(rows):
                 try:
-                    cells = await row.locator('td').all()
                     if len(cells) < 5:
                         # Header row or unexpected layout
                         continue
 
-                    name = (await cells[0].inner_text()).strip()
-                    status_text = (await cells[3].inner_text()).strip() if len(cells) > 3 else ""
-                    last_refresh_text = (await cells[4].inner_text()).strip() if len(cells) > 4 else ""
+                    name = cells[0].strip()
+                    status_text = cells[3].strip() if len(cells) > 3 else ""
+                    last_refresh_text = cells[4].strip() if len(cells) > 4 else ""
 
                     counts = parse_status_counts(last_refresh_text)
                     healthy = is_row_healthy(status_text, counts)
@@ -422,17 +462,21 @@ async def main() -> int:
             print(f"\n[Step 4] SCAN COMPLETE: {total} rows, {len(unhealthy)} issue(s)")
 
             # Step 5: Screenshot
-            timestamp = get_japan_time().strftime("%Y%m%d_%H%M%S")
-            screenshot_path = f"screenshots/web_status_{timestamp}.png"
-            os.makedirs("screenshots", exist_ok=True)
-            await page.screenshot(path=screenshot_path, full_page=True)
-            print(f"Screenshot saved: {screenshot_path}")
+            screenshot_path = SCREENSHOT_DIR / f"web_status_{file_ts}.jpg"
+            shot = await screenshot_table(page)
+            await save_screenshot(screenshot_path, shot)
 
             # Step 6: Optional image upload
             image_key = None
-            if app_id and app_secret:
+            if token_task:
+                tenant_token = None
+                try:
+                    tenant_token = await token_task
+                except Exception as e:
+                    print(f"  ⚠ Token fetch failed (falling back to SDK auth): {e}")
+                await sdk_import
                 try:
-                    image_key = await upload_image_to_lark_sdk(screenshot_path, app_id, app_secret)
+                    image_key = await upload_image_to_lark_sdk(shot, cfg.app_id, cfg.app_secret, tenant_token)
                 except Exception as e:
                     print(f"  ⚠ Image upload failed (continuing without image): {e}")
 
@@ -442,7 +486,7 @@ async def main() -> int:
             status_text_summary = "All Learned" if len(unhealthy) == 0 else f"{len(unhealthy)} issue(s)"
 
             summary_lines = [
-                f"**Time**: {get_japan_time().strftime('%Y-%m-%d %H:%M')} (Asia/Tokyo)",
+                f"**Time**: {now_str} (Asia/Tokyo)",
                 "",
                 "**Summary**:",
                 f"• Total Sources: {total}",
@@ -495,10 +539,8 @@ async def main() -> int:
                     "alt": {"tag": "plain_text", "content": "Website Connector Screenshot"},
                 })
 
-            response = requests.post(webhook_url, json=card, timeout=10)
-            print(f"Notification sent: {response.status_code}")
-
-            await browser.close()
+            # Deliver the report while Chromium shuts down
+            await asyncio.gather(send_webhook(cfg.webhook_url, card), browser.close())
 
             print("\n" + "=" * 60)
             print("WEBSITE MONITOR COMPLETED SUCCESSFULLY!")
@@ -506,18 +548,11 @@ async def main() -> int:
 
     except Exception as e:
         print(f"ERROR: {e}")
-        import traceback
         traceback.print_exc()
 
         try:
-            import requests
-            error_msg = (
-                f"⚠️ Website Monitor Error\n\n"
-                f"**Time**: {get_japan_time().strftime('%Y-%m-%d %H:%M')} (Asia/Tokyo)\n\n"
-                f"**Error**: {str(e)}\n\n"
-                f"---\n*This is an automated message*"
-            )
-            requests.post(webhook_url, json={"msg_type": "text", "content": {"text": error_msg}}, timeout=10)
+            error_msg = error_payload("Website Monitor Error", now_str, [("Error", str(e))])
+            await post_json(cfg.webhook_url, error_msg)
         except Exception:
             pass
 
@@ -526,54 +561,5 @@ async def main() -> int:
     return 0
 
 
-async def upload_image_to_lark_sdk(image_path: str, app_id: str, app_secret: str):
-    """Upload image to Lark using official SDK (mirrors monitor_actions.py)."""
-    from lark_oapi.api.im.v1.model.create_image_request import CreateImageRequest
-    from lark_oapi.api.im.v1.model.create_image_request_body import CreateImageRequestBody
-    import lark_oapi
-
-    image_file = Path(image_path)
-    if not image_file.exists():
-        print(f"Image not found: {image_path}")
-        return None
-
-    try:
-        print(f"Uploading image using Lark SDK...")
-        request = (
-            CreateImageRequest.builder()
-            .request_body(
-                CreateImageRequestBody.builder()
-                .image_type("message")
-                .build()
-            )
-            .build()
-        )
-        with open(image_file, 'rb') as f:
-            request.body.image = f
-            client = (
-                lark_oapi.Client.builder()
-                .app_id(app_id)
-                .app_secret(app_secret)
-                .build()
-            )
-            response = client.im.v1.image.create(request)
-
-        if response.code != 0:
-            print(f"Lark API error: code={response.code}, msg={response.msg}")
-            return None
-        if not response.data or not hasattr(response.data, 'image_key'):
-            print("No image_key in response")
-            return None
-
-        image_key = response.data.image_key
-        print(f"✓ Image uploaded: {image_key}")
-        return image_key
-    except Exception as e:
-        print(f"Upload error: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
-
-
 if __name__ == "__main__":
-    sys.exit(asyncio.run(main()))
+    sys.exit(asyncio.run(main(Config.from_env("DIRECT_WEB_URL"))))
@@ -0,0 +1,432 @@
+"""Helpers shared by the GitHub Actions monitor scripts.
+
+monitor_actions.py (KB files), monitor_actions_web.py (website connector)
+and monitor_actions_debug.py (page structure dump) all log in to the same
+admin panel and report to the same Lark bot; the common pieces live here.
+"""
+
+import asyncio
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import traceback
+from dataclasses import dataclass
+from datetime import timezone, timedelta
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Request blocking lives in src/automation so src/analyze_page.py uses the
+# same rules. Appended, not inserted, so src/ never shadows these scripts.
+sys.path.append(str(Path(__file__).parent / "src"))
+from automation.resources import DISABLE_IMAGES_ARG  # noqa: E402
+
+try:
+    import orjson
+except ImportError:  # optional speedup; fall back to the stdlib encoder
+    orjson = None
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Settings read from the environment (GitHub Actions secrets)."""
+
+    username: str
+    password: str
+    webhook_url: str
+    app_id: str
+    app_secret: str
+    direct_url: str
+    base_url: str = "https://admin.gbase.ai"
+
+    @classmethod
+    def from_env(cls, direct_url_var: str) -> "Config":
+        """Build a Config; ``direct_url_var`` names the page each script monitors."""
+        return cls(
+            username=os.environ.get("KB_USERNAME", ""),
+            password=os.environ.get("KB_PASSWORD", ""),
+            webhook_url=os.environ.get("LARK_WEBHOOK_URL", ""),
+            app_id=os.environ.get("LARK_APP_ID", ""),
+            app_secret=os.environ.get("LARK_APP_SECRET", ""),
+            direct_url=os.environ.get(direct_url_var, ""),
+            base_url=os.environ.get("BASE_URL", "https://admin.gbase.ai"),
+        )
+
+    @property
+    def masked_username(self) -> str:
+        """Username with all but the last four characters hidden, for logs."""
+        return "***" + self.username[-4:]
+
+
+JAPAN_TZ = timezone(timedelta(hours=9))
+
+
+# --- HTTP / Lark -----------------------------------------------------------
+
+def _build_session() -> requests.Session:
+    """HTTP session shared by every Lark call, so TLS connections are reused."""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry))
+    return session
+
+
+_SESSION = _build_session()
+
+
+_JSON_HEADERS = {"Content-Type": "application/json; charset=utf-8"}
+
+
+def _dump_json(payload: dict) -> bytes:
+    """Encode a payload as UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+async def post_json(url: str, payload: dict, timeout: int = 10) -> requests.Response:
+    """POST JSON on the shared session without blocking the event loop."""
+    return await asyncio.to_thread(
+        _SESSION.post, url, data=_dump_json(payload), headers=_JSON_HEADERS, timeout=timeout
+    )
+
+
+async def send_webhook(url: str, payload: dict, label: str = "Notification") -> None:
+    """Send a webhook message, reporting (not raising) delivery failures."""
+    try:
+        response = await post_json(url, payload)
+        print(f"{label} sent: {response.status_code}")
+    except Exception as e:
+        print(f"{label} failed: {e}")
+
+
+# Artifacts the workflows upload after each run; created once on import
+SCREENSHOT_DIR = Path("screenshots")
+SCREENSHOT_DIR.mkdir(exist_ok=True)
+
+# Status screenshots are uploaded from memory; SAVE_SCREENSHOTS=0 skips the
+# artifact copy for local runs that don't need it
+SAVE_SCREENSHOTS = os.environ.get("SAVE_SCREENSHOTS", "1") == "1"
+
+
+async def save_screenshot(path: Path, data: bytes) -> None:
+    """Write a status screenshot artifact unless SAVE_SCREENSHOTS is off."""
+    if not SAVE_SCREENSHOTS:
+        return
+    await asyncio.to_thread(path.write_bytes, data)
+    print(f"  Screenshot saved: {path}")
+
+
+_ERROR_TEMPLATE = "⚠️ {title}\n\n**Time**: {ts} (Asia/Tokyo)\n\n{fields}---\n*This is an automated message*"
+
+
+def error_payload(title: str, ts: str, fields: list) -> dict:
+    """Plain-text webhook payload for a failure alert; ``fields`` are (label, value) pairs."""
+    body = "".join(f"**{label}**: {value}\n\n" for label, value in fields)
+    return {"msg_type": "text", "content": {"text": _ERROR_TEMPLATE.format(title=title, ts=ts, fields=body)}}
+
+
+# Cookies and localStorage of the last logged-in context, for scripts that
+# run on a fresh browser instead of the persistent profile. Local only: like
+# the profile it holds the admin session, so it must never be cached on CI.
+SESSION_STATE_FILE = Path(tempfile.gettempdir()) / "kb-monitor-session.json"
+
+# Token per app_id, as (token, expiry timestamp). Kept in-process only, so
+# the tenant_access_token never outlives the run.
+_token_memo = {}
+
+
+async def get_lark_access_token_async(app_id: str, app_secret: str) -> str:
+    """Get Lark access token - async version, reusing a cached token when valid."""
+    token, exp = _token_memo.get(app_id, (None, 0))
+    if token and exp > time.time() + 60:
+        return token
+
+    url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
+    payload = {
+        "app_id": app_id,
+        "app_secret": app_secret
+    }
+
+    response = await post_json(url, payload)
+    response.raise_for_status()
+    result = response.json()
+
+    if result.get("code") != 0:
+        return None
+
+    token = result.get("tenant_access_token")
+    if token:
+        _token_memo[app_id] = (token, time.time() + result.get("expire", 0) - 60)
+    return token
+
+
+def _load_lark_sdk() -> None:
+    """Import the SDK modules upload_image_to_lark_sdk needs into sys.modules."""
+    try:
+        import lark_oapi  # noqa: F401
+        from lark_oapi.api.im.v1.model.create_image_request import CreateImageRequest  # noqa: F401
+        from lark_oapi.api.im.v1.model.create_image_request_body import CreateImageRequestBody  # noqa: F401
+    except ImportError as e:
+        print(f"lark-oapi SDK import error: {e}")
+
+
+def preload_lark_sdk() -> asyncio.Task:
+    """Start importing the Lark SDK on a worker thread.
+
+    lark_oapi takes about a second to import; doing it while Chromium launches
+    means the upload later finds it in sys.modules. Import errors are still
+    reported by the upload itself.
+    """
+    return asyncio.create_task(asyncio.to_thread(_load_lark_sdk))
+
+
+async def upload_image_to_lark_sdk(image_bytes: bytes, app_id: str, app_secret: str,
+                                   tenant_token: str = None) -> str:
+    """Upload image to Lark using official SDK (same as local script).
+
+    If ``tenant_token`` is given it is passed straight to the request so the
+    SDK skips its own token round-trip.
+    """
+    # Use correct import path
+    from lark_oapi.api.im.v1.model.create_image_request import CreateImageRequest
+    from lark_oapi.api.im.v1.model.create_image_request_body import CreateImageRequestBody
+    import lark_oapi
+
+    if not image_bytes:
+        print("No image data to upload")
+        return None
+
+    try:
+        print(f"Uploading image using Lark SDK...")
+
+        # Create image upload request
+        request = (
+            CreateImageRequest.builder()
+            .request_body(
+                CreateImageRequestBody.builder()
+                .image_type("message")  # for use in message cards
+                .build()
+            )
+            .build()
+        )
+
+        # Attach the in-memory screenshot to the request body
+        request.body.image = io.BytesIO(image_bytes)
+
+        # Get client using app credentials
+        builder = (
+            lark_oapi.Client.builder()
+            .app_id(app_id)
+            .app_secret(app_secret)
+        )
+        option = None
+        if tenant_token:
+            builder = builder.enable_set_token(True)
+            option = lark_oapi.RequestOption.builder().tenant_access_token(tenant_token).build()
+        client = builder.build()
+
+        # Call the API; the SDK is synchronous, so keep it off the event loop
+        response = await asyncio.to_thread(client.im.v1.image.create, request, option)
+
+        # Handle response
+        if response.code != 0:
+            print(f"Lark API error: code={response.code}, msg={response.msg}")
+            return None
+
+        if not response.data or not hasattr(response.data, 'image_key'):
+            print("No image_key in response")
+            return None
+
+        image_key = response.data.image_key
+        print(f"✓ Image uploaded: {image_key}")
+        return image_key
+
+    except ImportError as e:
+        print(f"lark-oapi SDK import error: {e}")
+        return None
+    except Exception as e:
+        print(f"Upload error: {e}")
+        traceback.print_exc()
+        return None
+
+
+# --- Browser ---------------------------------------------------------------
+
+# Headless Chromium does not need these subsystems; turning them off trims
+# launch time and the number of helper processes on the Actions runner
+CHROMIUM_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-translate",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--safebrowsing-disable-auto-update",
+    "--disable-features=IsolateOrigins,site-per-process,TranslateUI",
+    # Images are never needed; blocking them here keeps them out of the route handler
+    DISABLE_IMAGES_ARG,
+]
+
+CHROMIUM_LAUNCH_OPTIONS = {
+    "headless": True,
+    "chromium_sandbox": False,
+    "args": CHROMIUM_ARGS,
+    "ignore_default_args": ["--enable-automation"],
+}
+
+
+# Persistent Chromium profile. Local runs reuse it; on CI it starts empty
+PW_PROFILE = Path(os.environ.get("PW_PROFILE", "/tmp/pw-profile"))
+
+
+def profile_has_state() -> bool:
+    """True if ``PW_PROFILE`` was left behind by an earlier run.
+
+    Call it before launching: Chromium populates the directory on start.
+    """
+    return PW_PROFILE.is_dir() and any(PW_PROFILE.iterdir())
+
+
+async def launch_persistent_context(p):
+    """Launch Chromium on the persistent profile directory ``PW_PROFILE``.
+
+    On local runs the session cookie survives, which usually skips the
+    login, and so does the HTTP cache for requests that are not routed. On
+    CI the profile starts empty: it holds the admin session, so it is
+    deliberately never put into actions/cache. Reduced motion makes Mantine
+    skip its transitions, so menus and rows are ready as soon as they are
+    attached.
+    """
+    return await p.chromium.launch_persistent_context(
+        user_data_dir=str(PW_PROFILE),
+        reduced_motion="reduce",
+        **CHROMIUM_LAUNCH_OPTIONS,
+    )
+
+
+# Table that holds the status rows; the Lark card only needs this element
+TABLE_SELECTOR = 'table:has(tbody tr), [role="table"], [role="grid"]'
+
+
+async def screenshot_table(page) -> bytes:
+    """JPEG of the status table, or of the full page if the table can't be captured.
+
+    JPEG is several times smaller than PNG, and lossy is fine for a table the
+    reader only eyeballs.
+    """
+    table = page.locator(TABLE_SELECTOR).first
+    if await table.count():
+        try:
+            return await table.screenshot(type="jpeg", quality=75)
+        except Exception as e:
+            print(f"  ⚠ Table screenshot failed, falling back to full page: {e}")
+    return await page.screenshot(full_page=True, type="jpeg", quality=75)
+
+
+async def settle(page, timeout: int = 5000) -> None:
+    """Wait for the network to go quiet, but never longer than ``timeout`` ms."""
+    try:
+        await page.wait_for_load_state("networkidle", timeout=timeout)
+    except Exception:
+        pass
+
+
+def on_auth_page(url: str) -> bool:
+    """True while the browser is on the login form or the Auth0 redirect."""
+    return "/login" in url or "auth0.com" in url
+
+
+# Comma unions resolve in one call; .first takes the earliest visible match
+# in document order, which on the login form is the account field / submit button
+LOGIN_USERNAME_SELECTOR = 'input[name="username"], input[placeholder*="アカウント"], input[type="text"]'
+LOGIN_BUTTON_SELECTOR = 'button[type="submit"], button:has-text("ログイン"), .login-button'
+
+
+def _is_login_response(response) -> bool:
+    """Match the credential POST answered by the app or Auth0."""
+    url = response.url
+    return response.request.method == "POST" and ("login" in url or "auth" in url)
+
+
+async def login(page, cfg: Config) -> bool:
+    """Log in to the admin panel, unless the profile already has a session.
+
+    Returns False only when the login form could not be filled in; a slow
+    Auth0 redirect falls back to a direct navigation instead.
+    """
+    print(f"[Step 1] Logging in to {cfg.base_url}")
+    await page.goto(cfg.base_url, wait_until="domcontentloaded", timeout=60000)
+    await settle(page)
+
+    needs_login = (
+        on_auth_page(page.url)
+        or await page.locator('input[type="password"]').count() > 0
+    )
+    if not needs_login:
+        print(f"  ✓ Session restored from profile, skipping login: {page.url[:80]}")
+        return True
+
+    # The Auth0 form is rendered client-side; wait for it rather than racing it
+    try:
+        await page.wait_for_selector('input[type="password"]', state="visible", timeout=30000)
+    except Exception:
+        print("  ⚠ Password field did not appear within 30s")
+
+    # Fill credentials (login page uses placeholder attrs, not name attrs)
+    print("  Filling credentials...")
+    try:
+        await page.locator(f"{LOGIN_USERNAME_SELECTOR} >> visible=true").first.fill(cfg.username, timeout=10000)
+    except Exception:
+        print("  ERROR: Could not find username input")
+        return False
+
+    await page.fill('input[type="password"]', cfg.password)
+
+    # Move on as soon as the auth endpoint answers the form POST
+    print("  Clicking login button...")
+    clicked = False
+    try:
+        async with page.expect_response(_is_login_response, timeout=15000):
+            await page.locator(f"{LOGIN_BUTTON_SELECTOR} >> visible=true").first.click(timeout=10000)
+            clicked = True
+        print("  ✓ Login submitted")
+    except Exception as e:
+        if not clicked:
+            print("  ERROR: Could not find login button")
+            return False
+        print(f"  ⚠ No login response after submitting: {str(e)[:80]}")
+
+    # Then wait for the Auth0 redirect chain to land back on the app
+    print("  Waiting for login to complete (checking for redirect)...")
+    login_success = False
+    try:
+        await page.wait_for_url(
+            lambda url: not on_auth_page(url), wait_until="domcontentloaded", timeout=30000
+        )
+        print(f"  ✓ Login completed! Redirected to: {page.url[:80]}")
+        login_success = True
+    except Exception:
+        print(f"  Still on: {page.url[:80]}")
+
+    # If still on login/Auth0 page, try navigating to base URL directly
+    if not login_success or on_auth_page(page.url):
+        print("  ⚠ Login redirect may not have completed, trying direct navigation...")
+        await page.goto(cfg.base_url, wait_until="domcontentloaded", timeout=60000)
+        await settle(page, 10000)
+        print(f"  After direct nav: {page.url[:80]}")
+
+    return True
@@ -9,48 +9,61 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
 
-from playwright.async_api import async_playwright
+from automation import get_browser, close_browser, probe_page
+from automation.resources import BLOCKED_URL_RE, DISABLE_IMAGES_ARG, block_heavy_resources
 from utils import load_config, load_secrets
 
+# 登录 cookie 保存在这里，下次运行可跳过登录
+STATE_FILE = Path(__file__).parent.parent / "debug_output" / "state.json"
 
 async def main():
     # 加载配置
     config = load_config()
     secrets = load_secrets()
 
-    async with async_playwright() as p:
-        # 启动浏览器（可见模式）
-        browser = await p.chromium.launch(headless=False)
-        context = await browser.new_context(viewport={'width': 1920, 'height': 1080})
+    # 复用保存的登录状态：有效时跳过登录步骤
+    # 只分析 DOM 结构和文本：不加载图片，拦截字体和统计脚本；保留 CSS，截图和 innerText 都依赖样式
+    async with get_browser(
+        STATE_FILE, headless=False, launch_options={"args": [DISABLE_IMAGES_ARG]},
+        viewport={'width': 1280, 'height': 800},
+    ) as context:
+        await context.route(BLOCKED_URL_RE, block_heavy_resources)
         page = await context.new_page()
-
-        # 登录
-        print("[1] 登录中...")
-        await page.goto("https://admin.gbase.ai")
-        await page.wait_for_load_state("networkidle")
-
-        await page.fill('input[name="username"]', secrets.credentials["username"])
-        await page.fill('input[type="password"]', secrets.credentials["password"])
-        await page.get_by_role("button", name="ログイン").or_(page.locator('button[type="submit"]')).first.click()
-        await page.wait_for_load_state("networkidle")
-        print("   ✓ 登录成功")
-
-        # 导航到文件页面
-        print(f"[2] 导航到文件页面...")
         target_url = config.monitoring.direct_kb_url
-        await page.goto(target_url)
-        await page.wait_for_load_state("networkidle")
+
+        print("[1] 打开文件页面...")
+        await page.goto(target_url, wait_until="domcontentloaded")
+        # 等表格挂载即可；SPA 的轮询请求会让 networkidle 一直等下去。
+        # 登录状态失效时会被重定向到登录页，密码框也算页面就绪
+        ready_selector = "table, [role='row'], input[type='password']"
+        try:
+            await page.wait_for_selector(ready_selector, timeout=15000, state="attached")
+        except Exception:
+            print("   ⚠ 15 秒内未出现表格")
+
+        if await page.locator('input[type="password"]').count():
+            print("[2] 登录中...")
+            await page.fill('input[name="username"]', secrets.credentials["username"])
+            await page.fill('input[type="password"]', secrets.credentials["password"])
+            await page.get_by_role("button", name="ログイン").or_(page.locator('button[type="submit"]')).first.click()
+            await page.wait_for_url(lambda url: "/login" not in url and "auth0.com" not in url, wait_until="domcontentloaded")
+            print("   ✓ 登录成功")
+
+            await page.goto(target_url, wait_until="domcontentloaded")
+            try:
+                await page.wait_for_selector("table, [role='row']", timeout=15000, state="attached")
+            except Exception:
+                print("   ⚠ 15 秒内未出现表格")
+        else:
+            print("[2] 复用已保存的登录状态")
         print(f"   ✓ 当前 URL: {page.url}")
 
         # 保存截图
         screenshot_dir = Path(__file__).parent.parent / "screenshots"
         screenshot_dir.mkdir(exist_ok=True)
-        await page.screenshot(path=str(screenshot_dir / "analysis_page.png"), full_page=True)
-        print(f"   ✓ 截图保存: screenshots/analysis_page.png")
-
-        # 分析页面结构
-        print("\n[3] 分析页面元素...")
-        print("-" * 60)
+        # 整页截图用 JPEG，长页面的 PNG 压缩要花好几秒
+        await page.screenshot(path=str(screenshot_dir / "analysis_page.jpg"), full_page=True, type="jpeg", quality=50)
+        print(f"   ✓ 截图保存: screenshots/analysis_page.jpg")
 
         # 查找所有可能包含文件列表的元素
         selectors_to_test = [
@@ -63,78 +76,65 @@ async def main():
             '[data-testid*="file" i]',
             '[data-testid*="row" i]',
         ]
+        status_indicators = ["失敗", "エラー", "成功", "完了", "処理中", "error", "success", "failed"]
 
-        for selector in selectors_to_test:
-            try:
-                count = await page.locator(selector).count()
-                if count > 0:
-                    print(f"\n选择器: {selector}")
-                    print(f"  找到 {count} 个元素")
-
-                    # 显示前3个元素的文本内容
-                    for i in range(min(3, count)):
-                        try:
-                            text = await page.locator(selector).nth(i).inner_text()
-                            if text.strip():
-                                preview = text.strip()[:80].replace('\n', ' ')
-                                print(f"  [{i}] {preview}...")
-                        except:
-                            pass
-            except Exception as e:
-                pass
+        # 一次往返完成 [3]-[6] 的全部探测，并保存页面 HTML
+        probe = await probe_page(
+            page,
+            selectors=selectors_to_test,
+            indicators=status_indicators,
+            context_selector='tr, div, li',
+            html_file=Path(__file__).parent.parent / "debug_output" / "file_page.html",
+        )
+
+        # 分析页面结构
+        print("\n[3] 分析页面元素...")
+        print("-" * 60)
+
+        for selector, preview_probe in probe["previews"].items():
+            if preview_probe["count"] > 0:
+                print(f"\n选择器: {selector}")
+                print(f"  找到 {preview_probe['count']} 个元素")
+
+                # 显示前3个元素的文本内容
+                for i, text in enumerate(preview_probe["texts"]):
+                    if text.strip():
+                        preview = text.strip()[:80].replace('\n', ' ')
+                        print(f"  [{i}] {preview}...")
 
         # 查找状态相关的元素
         print("\n" + "-" * 60)
         print("[4] 查找状态指示器...")
 
-        status_indicators = ["失敗", "エラー", "成功", "完了", "処理中", "error", "success", "failed"]
-
         for indicator in status_indicators:
-            try:
-                elements = await page.get_by_text(indicator).all()
-                if elements:
-                    print(f"\n'{indicator}': 找到 {len(elements)} 个")
-
-                    # 显示包含该文字的父元素
-                    for i, el in enumerate(elements[:3]):
-                        try:
-                            # 获取父元素的文本
-                            parent_text = await el.evaluate("el => el.closest('tr, div, li')?.textContent")
-                            if parent_text:
-                                preview = parent_text.strip()[:100].replace('\n', ' ')
-                                print(f"  [{i}] {preview}...")
-                        except:
-                            pass
-            except:
-                pass
-
-        # 保存页面 HTML
+            hit = probe["indicators"][indicator]
+            if not hit["count"]:
+                continue
+            print(f"\n'{indicator}': 找到 {hit['count']} 个")
+
+            # 显示包含该文字的父元素
+            for i, parent_text in enumerate(hit["contexts"]):
+                if parent_text:
+                    preview = parent_text.strip()[:100].replace('\n', ' ')
+                    print(f"  [{i}] {preview}...")
+
+        # 页面 HTML
         print("\n" + "-" * 60)
         print("[5] 保存页面 HTML...")
-        html = await page.inner_html("body")
-        html_file = Path(__file__).parent.parent / "debug_output" / "file_page.html"
-        html_file.parent.mkdir(exist_ok=True)
-        with open(html_file, 'w', encoding='utf-8') as f:
-            f.write(html)
-        print(f"   ✓ HTML 保存: {html_file}")
+        print(f"   ✓ HTML 保存: {probe['html_file']}")
 
         # 查找所有表格
         print("\n" + "-" * 60)
         print("[6] 查找表格...")
-        tables = await page.locator('table').all()
+        tables = probe["tables"]
         print(f"找到 {len(tables)} 个表格")
 
         for i, table in enumerate(tables):
-            try:
-                rows = await table.locator('tr').all()
-                print(f"  表格 {i}: {len(rows)} 行")
+            print(f"  表格 {i}: {table['rows']} 行")
 
-                # 显示表头
-                if rows:
-                    header = await rows[0].inner_text()
-                    print(f"    表头: {header[:100]}...")
-            except:
-                pass
+            # 显示表头
+            if table['header'] is not None:
+                print(f"    表头: {table['header'][:100]}...")
 
         print("\n" + "=" * 60)
         print("分析完成！浏览器将保持打开 30 秒...")
@@ -142,7 +142,7 @@ async def main():
 
         await asyncio.sleep(30)
 
-        await browser.close()
+    await close_browser()
 
 
 if __name__ == "__main__":
@@ -1,17 +1,39 @@
-"""Automation modules for KB monitor."""
-
-from .browser_controller import BrowserController, NavigationResult, LoginResult
-from .kb_monitor import KBMonitor, MonitorResult, FailedItem
-from .retry_handler import RetryHandler, RetryResult, ErrorType
-
-__all__ = [
-    "BrowserController",
-    "NavigationResult",
-    "LoginResult",
-    "KBMonitor",
-    "MonitorResult",
-    "FailedItem",
-    "RetryHandler",
-    "RetryResult",
-    "ErrorType",
-]
+"""Automation modules for KB monitor.
+
+Exports are imported on first access, so a script that only needs
+``automation.page_probe`` does not pull in the controller, the monitor and
+their config/logging dependencies.
+"""
+
+from importlib import import_module
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    "BrowserController": ".browser_controller",
+    "NavigationResult": ".browser_controller",
+    "LoginResult": ".browser_controller",
+    "ensure_browser": ".browser_pool",
+    "get_browser": ".browser_pool",
+    "close_browser": ".browser_pool",
+    "probe_page": ".page_probe",
+    "KBMonitor": ".kb_monitor",
+    "MonitorResult": ".kb_monitor",
+    "FailedItem": ".kb_monitor",
+    "RetryHandler": ".retry_handler",
+    "RetryResult": ".retry_handler",
+    "ErrorType": ".retry_handler",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -2,18 +2,19 @@
 
 import asyncio
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Set, Any
 from dataclasses import dataclass
 from datetime import datetime
 
 try:
-    from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Locator, TimeoutError as PlaywrightTimeout
+    from playwright.async_api import Browser, BrowserContext, Page, Locator, TimeoutError as PlaywrightTimeout
 except ImportError:
     # Fallback for compatibility
-    from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Locator
+    from playwright.async_api import Browser, BrowserContext, Page, Locator
 
 
 from utils import get_logger, AppConfig
+from .browser_pool import ensure_browser
 
 
 @dataclass
@@ -49,6 +50,12 @@ class BrowserController:
         'link_by_text': 'text={text}',
     }
 
+    # Each login field as one query: the comma union resolves in a single
+    # call and `visible=true` skips hidden duplicates
+    USERNAME_LOCATOR = f"{SELECTORS['username_input']} >> visible=true"
+    PASSWORD_LOCATOR = f"{SELECTORS['password_input']} >> visible=true"
+    LOGIN_BUTTON_LOCATOR = f"{SELECTORS['login_button']} >> visible=true"
+
     def __init__(self, config: AppConfig):
         """
         Initialize browser controller.
@@ -59,23 +66,27 @@ class BrowserController:
         self.config = config
         self.logger = get_logger("browser_controller")
 
-        self._playwright = None
         self._browser: Optional[Browser] = None
         self._context: Optional[BrowserContext] = None
         self._page: Optional[Page] = None
+        # get_by_text locators per text; lazy, so they stay valid across navigations
+        self._text_locators: Dict[str, Locator] = {}
+        # Screenshot directories already created by this controller
+        self._created_dirs: Set[Path] = set()
 
     async def start(self) -> bool:
         """
-        Launch browser and create context.
+        Create a context on the shared browser, launching it if needed.
+
+        The Browser process is shared by every controller in the process
+        (see ``browser_pool``); each controller only owns its context and page.
 
         Returns:
             True if browser started successfully
         """
         try:
-            self._playwright = await async_playwright().start()
-
-            # Launch browser
-            self._browser = await self._playwright.chromium.launch(
+            # Launch browser (first controller only)
+            self._browser = await ensure_browser(
                 headless=self.config.browser.headless,
                 slow_mo=self.config.browser.slow_mo,
             )
@@ -92,6 +103,7 @@ class BrowserController:
 
             # Create new page
             self._page = await self._context.new_page()
+            self._text_locators.clear()
 
             self.logger.info(f"Browser started (headless={self.config.browser.headless})")
             return True
@@ -101,18 +113,19 @@ class BrowserController:
             return False
 
     async def close(self) -> None:
-        """Close browser and cleanup resources."""
+        """
+        Close this controller's context and page.
+
+        The shared browser stays up for other controllers; it is shut down
+        by ``close_browser()`` at process exit.
+        """
         try:
             if self._page:
                 await self._page.close()
             if self._context:
                 await self._context.close()
-            if self._browser:
-                await self._browser.close()
-            if self._playwright:
-                await self._playwright.stop()
 
-            self.logger.info("Browser closed")
+            self.logger.info("Browser context closed")
 
         except Exception as e:
             self.logger.warning(f"Error during browser cleanup: {e}")
@@ -129,7 +142,7 @@ class BrowserController:
         """
         try:
             self.logger.info(f"Navigating to: {url}")
-            await self._page.goto(url, wait_until="networkidle")
+            await self._page.goto(url, wait_until=self.config.browser.wait_until)
             return NavigationResult(
                 success=True,
                 message=f"Successfully navigated to {url}"
@@ -165,22 +178,9 @@ class BrowserController:
                     error=result.error
                 )
 
-            # Wait for page to load
-            await self._page.wait_for_load_state("networkidle")
-
-            # Try to find username input using multiple selectors
-            username_selectors = self.SELECTORS['username_input'].split(', ')
-            username_input = None
-
-            for selector in username_selectors:
-                try:
-                    username_input = self._page.locator(selector).first
-                    if await username_input.is_visible():
-                        break
-                except:
-                    continue
-
-            if not username_input or not await username_input.is_visible():
+            # Wait for the login form itself rather than for the network to go idle
+            username_input = await self._wait_visible(self.USERNAME_LOCATOR)
+            if not username_input:
                 return LoginResult(
                     success=False,
                     message="Could not find username input field"
@@ -191,18 +191,8 @@ class BrowserController:
             self.logger.debug("Username filled")
 
             # Find and fill password
-            password_selectors = self.SELECTORS['password_input'].split(', ')
-            password_input = None
-
-            for selector in password_selectors:
-                try:
-                    password_input = self._page.locator(selector).first
-                    if await password_input.is_visible():
-                        break
-                except:
-                    continue
-
-            if not password_input or not await password_input.is_visible():
+            password_input = await self._wait_visible(self.PASSWORD_LOCATOR)
+            if not password_input:
                 return LoginResult(
                     success=False,
                     message="Could not find password input field"
@@ -212,25 +202,15 @@ class BrowserController:
             self.logger.debug("Password filled")
 
             # Find and click login button
-            button_selectors = self.SELECTORS['login_button'].split(', ')
-            login_button = None
-
-            for selector in button_selectors:
-                try:
-                    login_button = self._page.locator(selector).first
-                    if await login_button.is_visible():
-                        break
-                except:
-                    continue
-
-            if not login_button or not await login_button.is_visible():
+            login_button = await self._wait_visible(self.LOGIN_BUTTON_LOCATOR)
+            if not login_button:
                 return LoginResult(
                     success=False,
                     message="Could not find login button"
                 )
 
             # Click and wait for navigation
-            async with self._page.expect_navigation(wait_until="networkidle", timeout=15000):
+            async with self._page.expect_navigation(wait_until=self.config.browser.wait_until, timeout=15000):
                 await login_button.click()
 
             # Check if login was successful
@@ -256,6 +236,23 @@ class BrowserController:
                 error=str(e)
             )
 
+    async def _wait_visible(self, selector: str) -> Optional[Locator]:
+        """
+        Wait for the first visible element matching a selector.
+
+        Args:
+            selector: Selector, typically a comma union of alternatives
+
+        Returns:
+            Locator of the element, or None if none became visible in time
+        """
+        locator = self._page.locator(selector).first
+        try:
+            await locator.wait_for(state="visible", timeout=self.config.browser.timeout)
+        except Exception:
+            return None
+        return locator
+
     async def navigate_to_kb(self, kb_name: str, related_kb_text: str, file_docs_text: str) -> NavigationResult:
         """
         Navigate to knowledge base files page.
@@ -271,38 +268,25 @@ class BrowserController:
             NavigationResult with success status
         """
         try:
+            # Each link is awaited as it renders, rather than waiting for the
+            # network to go idle after the previous click.
             # Click "関連ナレッジベース" (Related Knowledge Base)
             self.logger.info(f"Looking for '{related_kb_text}' link")
-            related_link = self._page.get_by_text(related_kb_text).first
-
-            if not await related_link.is_visible():
-                # Try alternative approach
-                related_link = self._page.locator(f"*[role='link']:has-text('{related_kb_text}')").first
-
+            related_link = await self._find_link(related_kb_text)
             await related_link.click()
-            await self._page.wait_for_load_state("networkidle")
             self.logger.debug(f"Clicked '{related_kb_text}'")
 
             # Click KB name
             self.logger.info(f"Looking for '{kb_name}' link")
-            kb_link = self._page.get_by_text(kb_name).first
-
-            if not await kb_link.is_visible():
-                kb_link = self._page.locator(f"*[role='link']:has-text('{kb_name}')").first
-
+            kb_link = await self._find_link(kb_name)
             await kb_link.click()
-            await self._page.wait_for_load_state("networkidle")
             self.logger.debug(f"Clicked '{kb_name}'")
 
             # Click "ファイルとドキュメント" (Files and Documents)
             self.logger.info(f"Looking for '{file_docs_text}' link")
-            docs_link = self._page.get_by_text(file_docs_text).first
-
-            if not await docs_link.is_visible():
-                docs_link = self._page.locator(f"*[role='link']:has-text('{file_docs_text}')").first
-
+            docs_link = await self._find_link(file_docs_text)
             await docs_link.click()
-            await self._page.wait_for_load_state("networkidle")
+            await self._page.wait_for_load_state(self.config.browser.wait_until)
             self.logger.debug(f"Clicked '{file_docs_text}'")
 
             return NavigationResult(
@@ -318,6 +302,37 @@ class BrowserController:
                 error=str(e)
             )
 
+    def _by_text(self, text: str) -> Locator:
+        """
+        Get the text locator for ``text``, built once per page.
+
+        Args:
+            text: Text to match
+
+        Returns:
+            Locator matching elements that contain the text
+        """
+        locator = self._text_locators.get(text)
+        if locator is None:
+            locator = self._text_locators[text] = self._page.get_by_text(text)
+        return locator
+
+    async def _find_link(self, text: str) -> Locator:
+        """
+        Locate a navigation link by its text, waiting for it to render.
+
+        Args:
+            text: Visible link text
+
+        Returns:
+            Locator for the first visible link (by accessible name) or text match
+        """
+        # Filter before .first: a hidden duplicate (e.g. the collapsed mobile
+        # menu) earlier in the DOM would otherwise be waited on until timeout
+        link = self._page.get_by_role("link", name=text).or_(self._by_text(text)).locator("visible=true").first
+        await link.wait_for(state="visible", timeout=self.config.browser.timeout)
+        return link
+
     async def navigate_to_url(self, url: str) -> NavigationResult:
         """
         Navigate directly to a specific URL.
@@ -332,10 +347,7 @@ class BrowserController:
         """
         try:
             self.logger.info(f"Navigating directly to: {url}")
-            await self._page.goto(url, wait_until="networkidle")
-
-            # Wait a bit for any dynamic content to load
-            await self._page.wait_for_timeout(2000)
+            await self._page.goto(url, wait_until=self.config.browser.wait_until)
 
             self.logger.info(f"Successfully navigated to: {self._page.url}")
             return NavigationResult(
@@ -351,25 +363,33 @@ class BrowserController:
                 error=str(e)
             )
 
-    async def take_screenshot(self, path: str, full_page: bool = True) -> Optional[str]:
+    async def take_screenshot(self, path: str, full_page: bool = False) -> Optional[str]:
         """
         Take a screenshot of the current page.
 
+        The image format follows ``screenshots.format``; JPEG is much cheaper
+        to encode than PNG and is the default.
+
         Args:
             path: File path to save screenshot
-            full_page: Capture full scrolling page
+            full_page: Capture full scrolling page instead of the viewport
 
         Returns:
             Path to saved screenshot, or None if failed
         """
         try:
             screenshot_path = Path(path)
-            screenshot_path.parent.mkdir(parents=True, exist_ok=True)
-
-            await self._page.screenshot(
-                path=str(screenshot_path),
-                full_page=full_page
-            )
+            parent = screenshot_path.parent
+            if parent not in self._created_dirs:
+                await asyncio.to_thread(parent.mkdir, parents=True, exist_ok=True)
+                self._created_dirs.add(parent)
+
+            # Capture to memory and write on a worker thread, off the event loop
+            options = {"full_page": full_page}
+            if self.config.screenshots.format in ("jpeg", "jpg"):
+                options.update(type="jpeg", quality=self.config.screenshots.quality)
+            data = await self._page.screenshot(**options)
+            await asyncio.to_thread(screenshot_path.write_bytes, data)
 
             self.logger.debug(f"Screenshot saved: {screenshot_path}")
             return str(screenshot_path)
@@ -392,7 +412,7 @@ class BrowserController:
             True if hover was successful
         """
         try:
-            element = self._page.get_by_text(text).first
+            element = self._by_text(text).first
             await element.hover(timeout=timeout)
             self.logger.debug(f"Hovered over element containing: '{text}'")
             return True
@@ -409,53 +429,69 @@ class BrowserController:
             text_patterns: List of text patterns to search for
 
         Returns:
-            List of matching element locators
+            List of matching element locators, in document order and without
+            duplicates
         """
-        found_elements = []
+        if not text_patterns:
+            return []
 
-        for pattern in text_patterns:
-            try:
-                elements = self._page.get_by_text(pattern).all()
-                if elements:
-                    found_elements.extend(elements)
-            except:
-                continue
+        # One union locator resolves every pattern in a single query
+        combined = self._by_text(text_patterns[0])
+        for pattern in text_patterns[1:]:
+            combined = combined.or_(self._by_text(pattern))
+
+        try:
+            found_elements = await combined.all()
+        except Exception as e:
+            self.logger.warning(f"Text search failed: {e}")
+            return []
 
         self.logger.debug(f"Found {len(found_elements)} elements matching patterns")
         return found_elements
 
-    async def click_button_with_text(self, text: str) -> bool:
+    async def click_button_with_text(self, text: str, timeout: int = 2000) -> bool:
         """
         Click a button containing specific text.
 
         Args:
             text: Text to search for in button
+            timeout: Milliseconds to wait for a visible button to become clickable
 
         Returns:
-            True if click was successful
+            True if click was successful; False straight away when no such
+            button is visible
         """
+        button = self._page.get_by_role("button", name=text).locator("visible=true").first
+        # Callers probe several labels in turn; a missing one must not cost
+        # the click timeout
+        if not await button.count():
+            return False
         try:
-            button = self._page.get_by_role("button", name=text).first
-            if await button.is_visible():
-                await button.click()
-                await self._page.wait_for_load_state("networkidle")
-                self.logger.debug(f"Clicked button: '{text}'")
-                return True
+            # click() waits for the button to be enabled itself
+            await button.click(timeout=timeout)
+        except Exception as e:
+            self.logger.debug(f"Button '{text}' not clickable: {e}")
             return False
 
+        try:
+            await self._page.wait_for_load_state(self.config.browser.wait_until)
         except Exception as e:
-            self.logger.warning(f"Failed to click button '{text}': {e}")
-            return False
+            self.logger.warning(f"Page did not settle after clicking '{text}': {e}")
+        self.logger.debug(f"Clicked button: '{text}'")
+        return True
 
-    async def get_page_text(self) -> str:
+    async def get_page_text(self, scope: str = "body") -> str:
         """
         Get all visible text from the current page.
 
+        Args:
+            scope: Selector of the element to read (default: whole body)
+
         Returns:
             Page text content
         """
         try:
-            return await self._page.inner_text("body")
+            return await self._page.locator(scope).first.inner_text()
         except Exception as e:
             self.logger.error(f"Failed to get page text: {e}")
             return ""
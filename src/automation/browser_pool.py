@@ -0,0 +1,90 @@
+"""Process-wide Playwright browser shared by short-lived scripts."""
+
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional, Union
+
+from playwright.async_api import async_playwright, Browser, BrowserContext
+
+
+_playwright = None
+_browser: Optional[Browser] = None
+# Concurrent first calls must not each launch a browser
+_launch_lock = asyncio.Lock()
+
+
+async def ensure_browser(headless: bool = True, **launch_options: Any) -> Browser:
+    """
+    Launch Chromium on first use and reuse it afterwards.
+
+    Launch arguments only take effect on the call that starts the browser.
+
+    Args:
+        headless: Launch mode
+        **launch_options: Extra options passed to ``chromium.launch``
+
+    Returns:
+        The process-wide Browser
+    """
+    global _playwright, _browser
+    async with _launch_lock:
+        if _browser is None or not _browser.is_connected():
+            if _playwright is None:
+                _playwright = await async_playwright().start()
+            _browser = await _playwright.chromium.launch(headless=headless, **launch_options)
+    return _browser
+
+
+@asynccontextmanager
+async def get_browser(
+    storage_state: Optional[Union[str, Path]] = None,
+    headless: bool = True,
+    launch_options: Optional[Dict[str, Any]] = None,
+    **context_options: Any,
+) -> AsyncIterator[BrowserContext]:
+    """
+    Hand out a fresh context on the shared browser.
+
+    Contexts are isolated from each other (cookies, storage, routes), so
+    several probes can run concurrently under ``asyncio.gather`` at the cost
+    of one browser process.
+
+    Args:
+        storage_state: Optional JSON file holding cookies/localStorage. It is
+            loaded when present and rewritten on exit, so a login survives
+            across runs.
+        headless: Launch mode, only used when the browser is first started
+        launch_options: Extra ``chromium.launch`` options, likewise only
+            used on first start; a ``headless`` key here wins
+        **context_options: Extra options passed to ``browser.new_context``
+
+    Yields:
+        A new BrowserContext, closed on exit
+    """
+    browser = await ensure_browser(**{"headless": headless, **(launch_options or {})})
+    state_file = Path(storage_state) if storage_state else None
+    if state_file and state_file.exists():
+        context_options["storage_state"] = str(state_file)
+
+    context = await browser.new_context(**context_options)
+    try:
+        yield context
+        if state_file:
+            state_file.parent.mkdir(parents=True, exist_ok=True)
+            await context.storage_state(path=str(state_file))
+    finally:
+        await context.close()
+
+
+async def close_browser() -> None:
+    """Close the shared browser and stop Playwright."""
+    global _playwright, _browser, _launch_lock
+    if _browser is not None:
+        await _browser.close()
+        _browser = None
+    if _playwright is not None:
+        await _playwright.stop()
+        _playwright = None
+    # The lock binds to the running loop; a later asyncio.run() needs a new one
+    _launch_lock = asyncio.Lock()
@@ -1,6 +1,7 @@
 """Knowledge base monitoring - core orchestration logic."""
 
 import asyncio
+import re
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
@@ -11,6 +12,13 @@ from .retry_handler import RetryHandler, RetryResult
 from utils import get_logger, AppConfig
 
 
+# Text of every row and of its first cell, read inside the page in one call
+ROW_TEXTS_JS = """rows => rows.map(r => {
+    const td = r.querySelector('td');
+    return {text: r.innerText, first: td ? td.innerText : null};
+})"""
+
+
 @dataclass
 class FailedItem:
     """Represents a failed KB item."""
@@ -63,6 +71,13 @@ class KBMonitor:
         self.retry_handler = RetryHandler(config)
         self.logger = get_logger("kb_monitor")
 
+        # All failure indicators as one case-insensitive alternation
+        # ("(?!)" never matches, for an empty indicator list)
+        self._failure_re = re.compile(
+            "|".join(re.escape(i) for i in config.monitoring.failure_indicators) or "(?!)",
+            re.IGNORECASE,
+        )
+
     async def check_status(
         self,
         username: str,
@@ -117,6 +132,9 @@ class KBMonitor:
 
             # Step 3: Scan for failures
             self.logger.info("Step 3: Scanning for failed items")
+            # Navigation no longer waits for networkidle; wait for the rows instead
+            if not await self.browser.wait_for_selector('tbody tr', timeout=15000):
+                self.logger.warning("No table rows appeared within 15s")
             failed_items = await self._scan_failures()
             result.failed_items = failed_items
             result.total_items = await self._count_total_items()
@@ -168,29 +186,24 @@ class KBMonitor:
         failed_items = []
 
         try:
-            # More reliable approach: check each table row for failure indicators
-            rows = await self.browser.page.locator('tbody tr').all()
+            # More reliable approach: check each table row for failure indicators.
+            # All row and first-cell texts come back from a single page call.
+            rows = await self.browser.page.eval_on_selector_all('tbody tr', ROW_TEXTS_JS)
             self.logger.debug(f"Scanning {len(rows)} rows for failures")
 
             for row_index, row in enumerate(rows):
                 try:
-                    # Get the full text content of this row
-                    row_text = await row.inner_text()
-                    row_text_lower = row_text.lower()
-
+                    row_text = row["text"]
                     # Check if any failure indicator is in this row (case-insensitive)
-                    has_failure = False
-                    matched_indicator = None
+                    match = self._failure_re.search(row_text)
 
-                    for indicator in self.config.monitoring.failure_indicators:
-                        if indicator in row_text_lower:
-                            has_failure = True
-                            matched_indicator = indicator
-                            break
+                    if match:
+                        # Keep the text as it appears in the row, so the
+                        # later row/cell lookups in _capture_failure_details match
+                        matched_indicator = match.group(0)
 
-                    if has_failure:
                         # Extract file name (usually first column or text)
-                        file_name = await self._extract_file_name_from_row(row, row_text)
+                        file_name = self._extract_file_name_from_row(row["first"], row_text)
 
                         self.logger.debug(f"Row {row_index} has failure: {file_name}")
 
@@ -218,12 +231,12 @@ class KBMonitor:
 
         return failed_items
 
-    async def _extract_file_name_from_row(self, row, row_text: str) -> Optional[str]:
+    def _extract_file_name_from_row(self, first_cell: Optional[str], row_text: str) -> Optional[str]:
         """
         Extract file name from a table row.
 
         Args:
-            row: Playwright Locator for the row element
+            first_cell: Text of the row's first cell, or None if it has none
             row_text: Text content of the row
 
         Returns:
@@ -232,15 +245,9 @@ class KBMonitor:
         if not row_text:
             return None
 
-        # Try to get the first cell (td) which usually contains the file name
-        try:
-            first_cell = row.locator('td').first
-            if await first_cell.count() > 0:
-                cell_text = await first_cell.inner_text()
-                if cell_text and cell_text.strip():
-                    return cell_text.strip()
-        except:
-            pass
+        # The first cell (td) usually contains the file name
+        if first_cell and first_cell.strip():
+            return first_cell.strip()
 
         # Parse the row text - file name is usually the first meaningful text
         lines = row_text.split('\n')
@@ -338,8 +345,12 @@ class KBMonitor:
 
                 # Find the row containing this failed item
                 target_row = None
-                for row in rows:
-                    row_text = await row.inner_text()
+                row_texts = await asyncio.gather(
+                    *(row.inner_text() for row in rows), return_exceptions=True
+                )
+                for row, row_text in zip(rows, row_texts):
+                    if isinstance(row_text, Exception):
+                        continue
                     # Check if this row contains the file name and failure indicator
                     if item.file_name in row_text and item.status_text in row_text:
                         target_row = row
@@ -356,9 +367,13 @@ class KBMonitor:
                 # Find the status cell in this row (look for cell with failure indicator)
                 status_cell = None
                 cells = await target_row.locator('td').all()
+                cell_texts = await asyncio.gather(
+                    *(cell.inner_text() for cell in cells), return_exceptions=True
+                )
 
-                for cell in cells:
-                    cell_text = await cell.inner_text()
+                for cell, cell_text in zip(cells, cell_texts):
+                    if isinstance(cell_text, Exception):
+                        continue
                     if item.status_text in cell_text:
                         status_cell = cell
                         break
@@ -449,7 +464,6 @@ class KBMonitor:
         """
         base_dir = Path(__file__).parent.parent.parent
         screenshot_dir = base_dir / self.config.screenshots.directory
-        screenshot_dir.mkdir(parents=True, exist_ok=True)
 
         extension = self.config.screenshots.format
         return str(screenshot_dir / f"{self.config.screenshots.prefix}{filename}.{extension}")
@@ -0,0 +1,113 @@
+"""Page-structure probe shared by the debug and analysis scripts."""
+
+import asyncio
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+from playwright.async_api import Page
+
+
+# Match counts for a list of selectors. Bare tag names go through the
+# engine's cached getElementsByTagName collection instead of a full QSA walk.
+COUNT_SELECTORS_JS = """sels => sels.map(s => /^[a-z][a-z0-9-]*$/i.test(s)
+    ? document.getElementsByTagName(s).length
+    : document.querySelectorAll(s).length)"""
+
+# Match count plus the text of the first `n` matches, per selector
+PREVIEW_SELECTORS_JS = """([sels, n]) => sels.map(s => {
+    const els = document.querySelectorAll(s);
+    return {count: els.length, texts: Array.from(els).slice(0, n).map(e => e.innerText)};
+})"""
+
+# Text nodes containing each word (case-insensitive), with the text of the
+# enclosing `closestSel` element for the first `n` of them. One alternation
+# regex (longest words first) scans each text node once for every word.
+TEXT_INDICATORS_JS = r"""([words, closestSel, n]) => {
+    const found = Object.fromEntries(words.map(w => [w, {count: 0, contexts: []}]));
+    if (!words.length) return found;
+    const byLower = new Map(words.map(w => [w.toLowerCase(), w]));
+    const escape = s => s.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+    const alternatives = [...words].sort((a, b) => b.length - a.length).map(escape);
+    const re = new RegExp(alternatives.join('|'), 'gi');
+    const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+    for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+        const seen = new Set();
+        for (const m of node.data.matchAll(re)) {
+            const w = byLower.get(m[0].toLowerCase());
+            if (seen.has(w)) continue;
+            seen.add(w);
+            const hit = found[w];
+            hit.count++;
+            if (hit.contexts.length < n) {
+                const el = node.parentElement && node.parentElement.closest(closestSel);
+                hit.contexts.push(el ? el.textContent : null);
+            }
+        }
+    }
+    return found;
+}"""
+
+# Row count and header text of every table
+TABLE_SUMMARY_JS = """() => Array.from(document.querySelectorAll('table'), t => {
+    const rows = t.querySelectorAll('tr');
+    return {rows: rows.length, header: rows.length ? rows[0].innerText : null};
+})"""
+
+# All of the above in a single round-trip
+PROBE_PAGE_JS = (
+    "([counted, previewed, n, words, closestSel, nContexts]) => ({"
+    f"counts: ({COUNT_SELECTORS_JS})(counted),"
+    f"previews: ({PREVIEW_SELECTORS_JS})([previewed, n]),"
+    f"indicators: ({TEXT_INDICATORS_JS})([words, closestSel, nContexts]),"
+    f"tables: ({TABLE_SUMMARY_JS})(),"
+    "})"
+)
+
+
+async def probe_page(
+    page: Page,
+    *,
+    selectors: Sequence[str] = (),
+    count_selectors: Sequence[str] = (),
+    indicators: Sequence[str] = (),
+    context_selector: str = "tr, div, li",
+    preview_count: int = 3,
+    context_count: int = 3,
+    html_file: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """
+    Collect the page-structure facts the debug scripts print.
+
+    Args:
+        page: Page to inspect
+        selectors: Selectors to count and preview (first `preview_count` texts)
+        count_selectors: Selectors that are only counted
+        indicators: Words to look for in the page text
+        context_selector: Enclosing element whose text is shown for a word hit
+        preview_count: Number of texts previewed per selector
+        context_count: Number of contexts kept per word
+        html_file: If given, the page HTML is written there
+
+    Returns:
+        Dict with ``counts`` and ``previews`` keyed by selector, ``indicators``
+        keyed by word, ``tables`` (rows and header text per table) and
+        ``html_file``
+    """
+    html = await page.content() if html_file is not None else None
+    pending = [page.evaluate(PROBE_PAGE_JS, [
+        list(count_selectors), list(selectors), preview_count,
+        list(indicators), context_selector, context_count,
+    ])]
+    if html is not None:
+        # The write runs in a worker thread while the probe evaluates
+        html_file.parent.mkdir(parents=True, exist_ok=True)
+        pending.append(asyncio.to_thread(html_file.write_text, html, encoding="utf-8"))
+
+    probe, *_ = await asyncio.gather(*pending)
+    return {
+        "counts": dict(zip(count_selectors, probe["counts"])),
+        "previews": dict(zip(selectors, probe["previews"])),
+        "indicators": probe["indicators"],
+        "tables": probe["tables"],
+        "html_file": html_file,
+    }
@@ -0,0 +1,22 @@
+"""Request blocking shared by the monitor and debug scripts."""
+
+import re
+
+
+# Chromium flag that stops images from being requested at all; cheaper than
+# aborting them in a route handler
+DISABLE_IMAGES_ARG = "--blink-settings=imagesEnabled=false"
+
+# Requests the scripts never need: tracker beacons and web fonts. Only these
+# URLs are routed, so every other request stays in the browser and keeps
+# using the HTTP cache. Stylesheets are kept so screenshots render properly.
+BLOCKED_URL_RE = re.compile(
+    r"analytics|doubleclick|sentry|googletagmanager|hotjar|segment\.(io|com)"
+    r"|\.(woff2?|ttf|otf|eot)(\?|$)",
+    re.IGNORECASE,
+)
+
+
+async def block_heavy_resources(route) -> None:
+    """Route handler for ``BLOCKED_URL_RE``: abort the request."""
+    await route.abort()
@@ -15,7 +15,7 @@ from typing import Optional
 sys.path.insert(0, str(Path(__file__).parent))
 
 from utils import load_config, load_secrets, setup_logger, ensure_directories, get_logger
-from automation import BrowserController, KBMonitor
+from automation import BrowserController, KBMonitor, close_browser
 from notifications import create_notifier
 
 
@@ -69,7 +69,7 @@ async def main() -> int:
         if not await browser_controller.start():
             logger.error("Failed to start browser")
             if notifier:
-                notifier.send_error_alert("Failed to start browser")
+                await asyncio.to_thread(notifier.send_error_alert, "Failed to start browser")
             return 1
 
         # Run monitoring
@@ -94,7 +94,12 @@ async def main() -> int:
         # Send notification
         if notifier:
             logger.info("Sending Lark notification")
-            notification_sent = notifier.send_summary(result, secrets)
+            # The blocking HTTP calls run on a worker thread while the browser shuts down
+            notification_sent, _ = await asyncio.gather(
+                asyncio.to_thread(notifier.send_summary, result, secrets),
+                browser_controller.close(),
+            )
+            browser_controller = None
 
             if notification_sent:
                 logger.info("Notification sent successfully")
@@ -114,7 +119,7 @@ async def main() -> int:
 
         # Send error alert
         if notifier:
-            notifier.send_error_alert(str(e), {
+            await asyncio.to_thread(notifier.send_error_alert, str(e), {
                 "timestamp": datetime.now().isoformat(),
                 "script": "main.py"
             })
@@ -126,6 +131,7 @@ async def main() -> int:
         logger.info("Cleaning up")
         if browser_controller:
             await browser_controller.close()
+        await close_browser()
 
         logger.info("Session complete")
         logger.info("=" * 60)
@@ -1,5 +1,6 @@
 """Lark notification sender using webhook with image upload support."""
 
+import io
 import json
 import base64
 import mimetypes
@@ -60,6 +61,9 @@ class LarkNotifier:
         self._access_token: Optional[str] = None
         self._token_expiry: Optional[float] = None
 
+        # Reuse one connection pool for the token and webhook calls
+        self._session = requests.Session()
+
     def _get_access_token(self) -> Optional[str]:
         """
         Get tenant access token for API calls.
@@ -85,7 +89,7 @@ class LarkNotifier:
                 "app_secret": self.app_secret
             }
 
-            response = requests.post(url, json=payload, timeout=10)
+            response = self._session.post(url, json=payload, timeout=10)
             response.raise_for_status()
             result = response.json()
 
@@ -151,21 +155,21 @@ class LarkNotifier:
                 .build()
             )
 
-            # Open file and attach to request body
-            with open(image_file, 'rb') as f:
-                request.body.image = f
+            # Read the file once and attach it from memory, so no file handle
+            # stays open across the API call
+            request.body.image = io.BytesIO(image_file.read_bytes())
 
-                # Get client using app credentials
-                client = (
-                    lark_oapi.Client.builder()
-                    .app_id(self.app_id or "")
-                    .app_secret(self.app_secret or "")
-                    .build()
-                )
+            # Get client using app credentials
+            client = (
+                lark_oapi.Client.builder()
+                .app_id(self.app_id or "")
+                .app_secret(self.app_secret or "")
+                .build()
+            )
 
-                # Call the API
-                self.logger.info("Calling Lark IM v1 image/create API...")
-                response = client.im.v1.image.create(request)
+            # Call the API
+            self.logger.info("Calling Lark IM v1 image/create API...")
+            response = client.im.v1.image.create(request)
 
             # Handle response
             if response.code != 0:
@@ -368,7 +372,7 @@ class LarkNotifier:
             True if sent successfully
         """
         try:
-            response = requests.post(
+            response = self._session.post(
                 self.webhook_url,
                 json=card,
                 timeout=self.config.lark.timeout
@@ -18,6 +18,7 @@ class BrowserConfig(BaseModel):
     headless: bool = True
     timeout: int = 30000
     slow_mo: int = 0
+    wait_until: str = "domcontentloaded"  # "networkidle" only for pages that need it
     screenshot: dict = Field(default_factory=lambda: {"enabled": True, "full_page": True})
 
 
@@ -63,7 +64,8 @@ class ScreenshotConfig(BaseModel):
     """Screenshot configuration."""
     directory: str = "screenshots"
     prefix: str = "kb_monitor_"
-    format: str = "png"
+    format: str = "jpeg"
+    quality: int = 70  # JPEG only
 
     @validator('format')
     def validate_format(cls, v):
@@ -12,7 +12,7 @@ print(f"LARK_APP_ID: {os.environ.get('LARK_APP_ID', 'NOT SET')}")
 print(f"LARK_APP_SECRET: {'***' + os.environ.get('LARK_APP_SECRET', 'NOT SET')[-4:] if os.environ.get('LARK_APP_SECRET') else 'NOT SET'}")
 
 # Try to load secrets
-sys.path.insert(0, '/home/runner/work/chatbot-kb-monitor/chatbot-kb-monitor/src')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
 try:
     from utils import load_secrets
     secrets = load_secrets()